@@ -1,50 +1,65 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
-from typing import List
-import os, tempfile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import AsyncIterator, List, Optional
+import asyncio, os
 
 from app.services.prompts import *
 from app.models.schemas import EmailGenerationRequest
-from app.utils.config import UPLOAD_DIR
-from app.services.file_processing import extract_text_from_file
-from app.services.calculate_match_score import calculate_match_score
-from app.services.generate_email import generate_interview_email, generate_rejection_email
+from app.services.file_processing import extract_text_from_bytes, get_extraction_cache, read_upload
+from app.services.generate_email import compose_email, render_email
 from app.services.generate_jd import generate_jd_with_gemini
 from app.services.generate_remarks import analyze_gap
+from app.services.pipeline import process_resumes, parse_text, select_shortlist, attach_gap, batch_duplicates
+from app.services.sessions import create_session
+from app.services.candidate_store import get_candidate_store
+from app.services.jobs import get_job_store, load_session, submit_job
+from app.utils.llm_client import get_response_cache, in_flight
+from app.utils.llm_scheduler import scheduler
+from app.utils.metrics import render_metrics, timed
+from app.utils.config import PARSE_MODES, EMAIL_MODE, EMAIL_MODES, EMAIL_CONCURRENCY, LLM_PROVIDER
 from app.services.generate_jd import *
 
 router = APIRouter()
 
+# Stream generated text as chunked plain text; errors before the first chunk still get a normal error response
+async def stream_text(chunks: AsyncIterator[str]) -> StreamingResponse:
+    first = await anext(chunks, "")
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
+
 # Upload JD file
 @router.post("/upload_jd_file")
-async def upload_jd_file(file: UploadFile = File(...)):
-    filepath = os.path.join(UPLOAD_DIR, file.filename)
-    with open(filepath, "wb") as f:
-        content = await file.read()
-        f.write(content)
+async def upload_jd_file(file: UploadFile = File(...), stream: bool = Form(False)):
+    content = await read_upload(file)
 
     try:
-        extracted_text = extract_text_from_file(filepath)
+        extracted_text = await extract_text_from_bytes(content, file.filename)
         if len(extracted_text.split()) < 20:
             return JSONResponse(status_code=400, content={"error": "File doesn't contain a valid JD."})
         
         prompt = upload_jd_file_prompt(extracted_text)
-        cleaned_jd = generate_jd_with_gemini(prompt)
+        if stream:
+            return await stream_text(stream_jd_with_gemini(prompt))
+        cleaned_jd = await generate_jd_with_gemini(prompt)
         return {"filename": file.filename, "text": cleaned_jd}
     except Exception as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
-    finally:
-        if os.path.exists(filepath):
-            os.unlink(filepath)
 
 # Manual JD input
 @router.post("/manual_jd")
-async def manual_jd_input(jd_text: str = Form(...)):
+async def manual_jd_input(jd_text: str = Form(...), stream: bool = Form(False)):
     if len(jd_text.strip().split()) < 20:
         return JSONResponse(status_code=400, content={"error": "JD too short or incomplete."})
 
     prompt = get_manule_jd_prompt(jd_text)
-    cleaned_jd = generate_jd_with_gemini(prompt)
+    if stream:
+        return await stream_text(stream_jd_with_gemini(prompt))
+    cleaned_jd = await generate_jd_with_gemini(prompt)
     return {"text": cleaned_jd}
 
 # Generate JD from input fields
@@ -56,150 +71,241 @@ async def generate_jd(
     company: str = Form(...),
     employment_type: str = Form(...),
     industry: str = Form(...),
-    location: str = Form(...)
+    location: str = Form(...),
+    stream: bool = Form(False)
 ):
     if not job_title.strip() or not skills.strip():
         return JSONResponse(status_code=400, content={"error": "Job Title and Skills are mandatory."})
 
     prompt = get_jd_generation_prompt(job_title, experience, skills, company, employment_type, industry, location)
-    generated_jd = generate_jd_with_gemini(prompt)
+    if stream:
+        return await stream_text(stream_jd_with_gemini(prompt))
+    generated_jd = await generate_jd_with_gemini(prompt)
     return {"text": generated_jd}
 
+# Reject unknown parse modes up front
+def check_parse_mode(parse_mode: Optional[str]):
+    if parse_mode and parse_mode not in PARSE_MODES:
+        raise HTTPException(status_code=400, detail=f"parse_mode must be one of: {', '.join(PARSE_MODES)}")
+
+# Reject shortlist cutoffs that would select nobody
+def check_shortlist(top_k: Optional[int]):
+    if top_k is not None and top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1.")
+
 # Compare JD and resume files
 @router.post("/compare-jd-and-files/")
-async def compare_jd_and_files(jd_text: str = Form(...), files: List[UploadFile] = File(...)):
+async def compare_jd_and_files(
+    jd_text: str = Form(...),
+    files: List[UploadFile] = File(...),
+    batch_size: Optional[int] = Form(None),
+    parse_mode: Optional[str] = Form(None),
+    top_k: Optional[int] = Form(None),
+    min_score: Optional[float] = Form(None),
+    background: bool = Form(False)
+):
+    check_parse_mode(parse_mode)
+    check_shortlist(top_k)
+    if background:
+        # Large batches run as a durable job polled through GET /jobs/{job_id}
+        uploads = [(file.filename, bytes(await read_upload(file))) for file in files]
+        options = {"batch_size": batch_size, "parse_mode": parse_mode, "top_k": top_k, "min_score": min_score}
+        job_id = await submit_job(jd_text, uploads, options)
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued", "total_files": len(uploads)})
+
     try:
-        main_parsed = parse_jd_with_gemini(jd_text)
+        main_parsed = await parse_text(jd_text, parse_mode)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Main JD parsing failed: {str(e)}")
 
-    results = []
-    for file in files:
-        suffix = os.path.splitext(file.filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
+    results = await process_resumes(files, main_parsed, batch_size=batch_size, parse_mode=parse_mode,
+                                    top_k=top_k, min_score=min_score)
 
-        try:
-            text = extract_text_from_file(tmp_path)
-            if not text:
-                raise ValueError("Empty content")
-
-            parsed = parse_jd_with_gemini(text)
-            score = calculate_match_score(main_parsed, parsed)
-            gap = analyze_gap(main_parsed, parsed)
-
-            results.append({
-                "filename": file.filename,
-                "parsed": parsed,
-                "score": score,
-                "missing_skills": gap["missing_skills"],
-                "remarks": gap["remarks"]
-            })
-        except Exception as e:
-            results.append({"filename": file.filename, "error": str(e)})
-        finally:
-            os.unlink(tmp_path)
+    # Keep the parsed results so /generate-emails/ can reuse them
+    session_id = create_session(jd_text, main_parsed, results)
 
-    return JSONResponse(content={"main_parsed": main_parsed, "results": results})
+    return JSONResponse(content={"session_id": session_id, "main_parsed": main_parsed, "results": results})
 
 # Generate emails based on comparison
 @router.post("/generate-emails/")
-async def generate_emails(jd_text: str = Form(...), files: List[UploadFile] = File(...)):
-    try:
-        main_parsed = parse_jd_with_gemini(jd_text)
-        job_title = main_parsed.get("job_title", "")
-        company_name = main_parsed.get("company_name", "")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"JD parsing failed: {str(e)}")
+async def generate_emails(
+    jd_text: Optional[str] = Form(None),
+    files: List[UploadFile] = File([]),
+    session_id: Optional[str] = Form(None),
+    batch_size: Optional[int] = Form(None),
+    parse_mode: Optional[str] = Form(None),
+    top_k: Optional[int] = Form(None),
+    min_score: Optional[float] = Form(None),
+    email_mode: Optional[str] = Form(None)
+):
+    check_parse_mode(parse_mode)
+    check_shortlist(top_k)
+    email_mode = email_mode or EMAIL_MODE
+    if email_mode not in EMAIL_MODES:
+        raise HTTPException(status_code=400, detail=f"email_mode must be one of: {', '.join(EMAIL_MODES)}")
+    if session_id:
+        # Reuse a previous comparison instead of re-extracting and re-parsing
+        session = load_session(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Comparison session not found or expired.")
+        jd_text = session["jd_text"]
+        main_parsed = session["main_parsed"]
+        processed_results = session["results"]
+    else:
+        if not jd_text or not files:
+            raise HTTPException(status_code=400, detail="Either session_id or jd_text and files are required.")
+        try:
+            main_parsed = await parse_text(jd_text, parse_mode)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"JD parsing failed: {str(e)}")
+        processed_results = await process_resumes(files, main_parsed, batch_size=batch_size, parse_mode=parse_mode,
+                                                  top_k=top_k, min_score=min_score)
+
+    job_title = main_parsed.get("job_title", "")
+    company_name = main_parsed.get("company_name", "")
 
     results = []
     valid_candidates = []
 
-    for file in files:
-        suffix = os.path.splitext(file.filename)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            content = await file.read()
-            tmp.write(content)
-            tmp_path = tmp.name
+    for processed in processed_results:
+        if "error" in processed:
+            results.append({"filename": processed["filename"], "error": processed["error"], "email": None})
+            continue
+        valid_candidates.append(processed)
+
+    # A near-duplicate is the same person as its original, who alone is shortlisted and emailed
+    duplicates = batch_duplicates(valid_candidates)
+    for i in sorted(duplicates):
+        duplicate = valid_candidates[i]
+        results.append({"filename": duplicate["filename"], "duplicate_of": duplicate["duplicate_of"],
+                        "score": duplicate["score"], "shortlisted": False, "email_content": None})
+    valid_candidates = [candidate for i, candidate in enumerate(valid_candidates) if i not in duplicates]
+
+    # Only the shortlist gets Gemini-personalized emails; everyone else gets the plain template
+    shortlist = select_shortlist(((i, c["score"]) for i, c in enumerate(valid_candidates)), top_k, min_score)
+    best_score = max((valid_candidates[i]["score"] for i in shortlist), default=None)
+    semaphore = asyncio.Semaphore(max(1, EMAIL_CONCURRENCY))
 
+    async def build_email(i: int, processed: dict) -> dict:
+        candidate_name = os.path.splitext(processed["filename"])[0].replace("_", " ").replace("-", " ").title()
+        shortlisted = i in shortlist
         try:
-            text = extract_text_from_file(tmp_path)
-            if not text:
-                raise ValueError("Empty content")
+            # Session results may come from a tighter cutoff without the gap analysis
+            if shortlisted and not processed.get("shortlisted", True):
+                processed = attach_gap(dict(processed, shortlisted=True), main_parsed)
+            is_best_match = shortlisted and processed["score"] == best_score
 
-            parsed = parse_jd_with_gemini(text)
-            score = calculate_match_score(main_parsed, parsed)
-            gap = analyze_gap(main_parsed, parsed)
+            email_request = EmailGenerationRequest(
+                jd_text=jd_text,
+                candidate_name=candidate_name,
+                filename=processed["filename"],
+                match_score=processed["score"],
+                missing_skills=processed["missing_skills"],
+                candidate_skills=processed["parsed"].get("skills", []),
+                job_title=job_title,
+                company_name=company_name,
+                is_best_match=is_best_match
+            )
 
-            candidate_name = os.path.splitext(file.filename)[0].replace("_", " ").replace("-", " ").title()
+            if shortlisted and email_mode != "template":
+                async with semaphore:
+                    with timed("email"):
+                        email_content = await compose_email(email_request, email_mode)
+            else:
+                with timed("email"):
+                    email_content = render_email(email_request)
 
-            candidate_data = {
-                "filename": file.filename,
+            return {
+                "filename": processed["filename"],
                 "candidate_name": candidate_name,
-                "parsed": parsed,
-                "score": score,
-                "missing_skills": gap["missing_skills"],
-                "candidate_skills": parsed.get("skills", [])
+                "score": processed["score"],
+                "email_type": "interview" if is_best_match else "rejection",
+                "email_content": email_content,
+                "is_best_match": is_best_match,
+                "shortlisted": shortlisted,
+                "missing_skills": processed["missing_skills"]
             }
 
-            valid_candidates.append(candidate_data)
-
         except Exception as e:
-            results.append({"filename": file.filename, "error": str(e), "email": None})
-        finally:
-            os.unlink(tmp_path)
-
-    if valid_candidates:
-        best_candidate = max(valid_candidates, key=lambda x: x["score"])
-        best_score = best_candidate["score"]
-
-        for candidate in valid_candidates:
-            try:
-                is_best_match = candidate["score"] == best_score
-
-                email_request = EmailGenerationRequest(
-                    jd_text=jd_text,
-                    candidate_name=candidate["candidate_name"],
-                    filename=candidate["filename"],
-                    match_score=candidate["score"],
-                    missing_skills=candidate["missing_skills"],
-                    candidate_skills=candidate["candidate_skills"],
-                    job_title=job_title,
-                    company_name=company_name,
-                    is_best_match=is_best_match
-                )
-
-                if is_best_match:
-                    email_content = generate_interview_email(email_request)
-                    email_type = "interview"
-                else:
-                    email_content = generate_rejection_email(email_request)
-                    email_type = "rejection"
-
-                results.append({
-                    "filename": candidate["filename"],
-                    "candidate_name": candidate["candidate_name"],
-                    "score": candidate["score"],
-                    "email_type": email_type,
-                    "email_content": email_content,
-                    "is_best_match": is_best_match,
-                    "missing_skills": candidate["missing_skills"]
-                })
-
-            except Exception as e:
-                results.append({
-                    "filename": candidate["filename"],
-                    "candidate_name": candidate["candidate_name"],
-                    "error": f"Email generation failed: {str(e)}",
-                    "email_content": None
-                })
+            return {
+                "filename": processed["filename"],
+                "candidate_name": candidate_name,
+                "error": f"Email generation failed: {str(e)}",
+                "email_content": None
+            }
+
+    results.extend(await asyncio.gather(*(build_email(i, processed) for i, processed in enumerate(valid_candidates))))
 
     return JSONResponse(content={
         "main_parsed": main_parsed,
-        "total_candidates": len(files),
-        "processed_candidates": len(valid_candidates),
-        "best_match_score": best_candidate["score"] if valid_candidates else 0,
+        "total_candidates": len(processed_results),
+        "processed_candidates": len(valid_candidates) + len(duplicates),
+        "duplicate_candidates": len(duplicates),
+        "shortlisted_candidates": len(shortlist),
+        "best_match_score": max((c["score"] for c in valid_candidates), default=0),
         "results": results
     })
+
+# Progress and partial results of a background comparison
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return JSONResponse(content=job)
+
+# Rank previously parsed candidates against a JD without re-uploading resumes
+@router.post("/search-candidates")
+async def search_candidates(
+    jd_text: str = Form(...),
+    limit: int = Form(20),
+    parse_mode: Optional[str] = Form(None)
+):
+    check_parse_mode(parse_mode)
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1.")
+    store = get_candidate_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Candidate store is disabled.")
+
+    try:
+        main_parsed = await parse_text(jd_text, parse_mode)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Main JD parsing failed: {str(e)}")
+
+    with timed("search"):
+        ranked = store.search(main_parsed, limit)
+
+    results = []
+    for candidate_id, score in ranked:
+        candidate = store.candidates[candidate_id]
+        gap = analyze_gap(main_parsed, candidate["parsed"])
+        results.append({
+            "candidate_id": candidate_id,
+            "filename": candidate["filename"],
+            "parsed": candidate["parsed"],
+            "score": score,
+            "missing_skills": gap["missing_skills"],
+            "remarks": gap["remarks"]
+        })
+
+    return JSONResponse(content={"main_parsed": main_parsed, "total_candidates": len(store), "results": results})
+
+# LLM response and text extraction cache hit/miss counters
+@router.get("/cache/stats")
+async def cache_stats():
+    response_cache, extraction_cache = get_response_cache(), get_extraction_cache()
+    return {
+        "llm": response_cache.stats() if response_cache else None,
+        "extraction": extraction_cache.stats() if extraction_cache else None
+    }
+
+# Gemini scheduler queue depth, per-lane wait times, retries, remaining budgets and coalesced calls
+@router.get("/llm/stats")
+async def llm_stats():
+    return {"provider": LLM_PROVIDER, **scheduler.stats(), "single_flight": in_flight.stats()}
+
+# Prometheus scrape endpoint: stage latency histograms, LLM sizes and errors, cache and queue counters
+@router.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,34 @@
 from difflib import SequenceMatcher
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+from app.services.normalize import normalized, candidate_years, meets_experience
+
+# NumPy is only needed by CandidateMatrix and imported there, so importing the app doesn't load it
+if TYPE_CHECKING:
+    import numpy as np
+
+# Compute text similarity as a 0-100 score
+def text_similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio() * 100 if a and b else 0.0
+
+# Experience match: a range check on normalized years, text similarity if either side doesn't normalize
+def experience_score(main: dict, other: dict) -> float:
+    required = normalized(main, "experience_years")
+    found = normalized(other, "experience_years")
+    if required is None or found is None:
+        return text_similarity(main.get("experience", ""), other.get("experience", ""))
+    if meets_experience(required, found) or required[0] <= 0:
+        return 100.0
+    return (candidate_years(found) / required[0]) * 100
+
+# Education match: the candidate's highest degree against the lowest degree the JD accepts, text
+# similarity if either side doesn't normalize
+def education_score(main: dict, other: dict) -> float:
+    required = normalized(main, "education_min_level")
+    found = normalized(other, "education_level")
+    if required is None or found is None:
+        return text_similarity(main.get("education", ""), other.get("education", ""))
+    return 100.0 if found >= required else (found / required) * 100
 
 # Calculate a match score between two JDs
 def calculate_match_score(main: dict, other: dict) -> float:
@@ -9,14 +39,112 @@ def calculate_match_score(main: dict, other: dict) -> float:
         overlap = len(set(list1) & set(list2))
         return (overlap / len(set(list1))) * 100
 
-    # Compute text similarity
-    def text_similarity(a: str, b: str) -> float:
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio() * 100 if a and b else 0.0
-
     skill_score = list_overlap_score(main.get("skills", []), other.get("skills", []))
-    exp_score = text_similarity(main.get("experience", ""), other.get("experience", ""))
-    edu_score = text_similarity(main.get("education", ""), other.get("education", ""))
+    exp_score = experience_score(main, other)
+    edu_score = education_score(main, other)
 
     # Weighted total match score
     total_score = 0.7 * skill_score + 0.2 * exp_score + 0.1 * edu_score
-    return round(total_score, 2)
\ No newline at end of file
+    return round(total_score, 2)
+
+class ValueColumn:
+    # Rows grouped by their distinct value of one field, so each value is scored once per JD
+    def __init__(self, field: str):
+        self.field = field
+        self.group_of_value = {}
+        self.representatives: List[dict] = []
+        self.group_ids: List[int] = []
+
+    def append(self, parsed: dict):
+        value = parsed.get(self.field, "")
+        group = self.group_of_value.get(value)
+        if group is None:
+            group = self.group_of_value[value] = len(self.representatives)
+            self.representatives.append(parsed)
+        self.group_ids.append(group)
+
+    def scores(self, main: dict, score, group_ids: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+        if not self.representatives:
+            return np.zeros(0)
+        group_scores = np.array([score(main, representative) for representative in self.representatives])
+        return group_scores[group_ids]
+
+
+class CandidateMatrix:
+    # Columnar view of many parsed candidates for batch scoring: a sparse candidate x skill
+    # matrix kept as per-skill posting lists, plus the distinct experience/education values
+    def __init__(self, others: Iterable[dict] = ()):
+        self.rows = 0
+        self.postings: Dict[Any, List[int]] = defaultdict(list)
+        self.has_skills: List[bool] = []
+        self.experience = ValueColumn("experience")
+        self.education = ValueColumn("education")
+        self._arrays = {}
+        for other in others:
+            self.append(other)
+
+    def append(self, parsed: dict, skills: Optional[Iterable] = None) -> int:
+        row = self.rows
+        skills = set(parsed.get("skills", []) if skills is None else skills)
+        for skill in skills:
+            self.postings[skill].append(row)
+        self.has_skills.append(bool(parsed.get("skills", [])))
+        self.experience.append(parsed)
+        self.education.append(parsed)
+        self.rows += 1
+        self._arrays.clear()
+        return row
+
+    # NumPy copies of the row lists, rebuilt only after appends
+    def _array(self, key, values: List) -> "np.ndarray":
+        import numpy as np
+        array = self._arrays.get(key)
+        if array is None:
+            array = self._arrays[key] = np.array(values, dtype=bool if key == "has_skills" else np.int64)
+        return array
+
+    # Unrounded match score of every row against a JD (same formula as calculate_match_score)
+    def score(self, main: dict) -> "np.ndarray":
+        import numpy as np
+        main_skills = set(main.get("skills", []))
+        if main_skills:
+            # Overlap counts straight from the posting lists of the JD's skills
+            counts = np.zeros(self.rows)
+            for skill in main_skills:
+                if skill in self.postings:
+                    counts[self._array(("skill", skill), self.postings[skill])] += 1
+            skill_scores = np.where(self._array("has_skills", self.has_skills), (counts / len(main_skills)) * 100, 0.0)
+        else:
+            skill_scores = np.zeros(self.rows)
+
+        exp_scores = self.experience.scores(main, experience_score, self._array("experience", self.experience.group_ids))
+        edu_scores = self.education.scores(main, education_score, self._array("education", self.education.group_ids))
+        return 0.7 * skill_scores + 0.2 * exp_scores + 0.1 * edu_scores
+
+
+# Calculate match scores of many candidates against one JD at once (same formula as
+# calculate_match_score). A one-off batch is scored row by row: building a CandidateMatrix costs
+# more than it saves unless the matrix is kept, as the candidate store does. Each distinct
+# experience/education value is still scored only once.
+def calculate_match_scores(main: dict, others: List[dict]) -> List[float]:
+    main_skills = set(main.get("skills", []))
+    experience_cache: Dict[Any, float] = {}
+    education_cache: Dict[Any, float] = {}
+    scores = []
+    for other in others:
+        skills = other.get("skills", [])
+        skill_score = len(main_skills.intersection(skills)) / len(main_skills) * 100 if main_skills and skills else 0.0
+
+        experience = other.get("experience", "")
+        exp_score = experience_cache.get(experience)
+        if exp_score is None:
+            exp_score = experience_cache[experience] = experience_score(main, other)
+
+        education = other.get("education", "")
+        edu_score = education_cache.get(education)
+        if edu_score is None:
+            edu_score = education_cache[education] = education_score(main, other)
+
+        scores.append(round(0.7 * skill_score + 0.2 * exp_score + 0.1 * edu_score, 2))
+    return scores
@@ -0,0 +1,121 @@
+import json, os, sqlite3, threading, time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.utils.config import CANDIDATE_STORE_ENABLED, CANDIDATE_STORE_DB
+from app.services.calculate_match_score import CandidateMatrix
+from app.services.fast_parser import canonical_skill
+
+
+# Canonical skill names of a parsed document, so the index has one posting list per skill
+# whichever parser (or spelling) produced it
+def canonical_skills(skills: Iterable) -> set:
+    return {canonical_skill(skill) for skill in skills if isinstance(skill, str) and skill.strip()}
+
+
+class CandidateStore:
+    # Parsed candidates in SQLite (WAL), mirrored in memory as a scoring matrix with per-skill posting lists
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY,
+            content_hash TEXT UNIQUE NOT NULL,
+            filename TEXT NOT NULL,
+            parsed TEXT NOT NULL,
+            created REAL NOT NULL
+        )""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS candidate_skills (
+            skill TEXT NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            PRIMARY KEY (skill, candidate_id)
+        ) WITHOUT ROWID""")
+
+        self.candidates: Dict[int, dict] = {}
+        self.ids_by_hash: Dict[str, int] = {}
+        self._load()
+
+    def _load(self):
+        for candidate_id, content_hash, filename, parsed in self._db.execute(
+                "SELECT id, content_hash, filename, parsed FROM candidates ORDER BY id"):
+            self.candidates[candidate_id] = {"filename": filename, "parsed": json.loads(parsed)}
+            self.ids_by_hash[content_hash] = candidate_id
+        skills = defaultdict(list)
+        for skill, candidate_id in self._db.execute("SELECT skill, candidate_id FROM candidate_skills"):
+            skills[candidate_id].append(skill)
+        # Rows indexed before skills were canonicalized map onto the same postings
+        self._build({candidate_id: canonical_skills(names) for candidate_id, names in skills.items()})
+
+    # Rebuild the scoring matrix; persisted skill rows stand in for the parsed lists when given
+    def _build(self, skills: Optional[Dict[int, List[str]]] = None):
+        self.matrix = CandidateMatrix()
+        self.row_ids: List[int] = []
+        for candidate_id, candidate in self.candidates.items():
+            parsed = candidate["parsed"]
+            self.matrix.append(parsed, skills.get(candidate_id, ()) if skills is not None else canonical_skills(parsed.get("skills", [])))
+            self.row_ids.append(candidate_id)
+        self._stale = False
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    # Insert or refresh candidates keyed by the hash of their extracted text; returns their IDs
+    def add_many(self, items: Iterable[Tuple[str, str, dict]]) -> List[int]:
+        ids = []
+        with self._lock, self._db:
+            for content_hash, filename, parsed in items:
+                skills = canonical_skills(parsed.get("skills", []))
+                candidate_id = self.ids_by_hash.get(content_hash)
+                if candidate_id is None:
+                    candidate_id = self._db.execute(
+                        "INSERT INTO candidates (content_hash, filename, parsed, created) VALUES (?, ?, ?, ?)",
+                        (content_hash, filename, json.dumps(parsed), time.time())
+                    ).lastrowid
+                    self.ids_by_hash[content_hash] = candidate_id
+                    if not self._stale:
+                        self.matrix.append(parsed, skills)
+                        self.row_ids.append(candidate_id)
+                else:
+                    self._db.execute("UPDATE candidates SET filename = ?, parsed = ? WHERE id = ?",
+                                     (filename, json.dumps(parsed), candidate_id))
+                    self._db.execute("DELETE FROM candidate_skills WHERE candidate_id = ?", (candidate_id,))
+                    # Matrix rows are append-only, so a refreshed candidate means a rebuild on next search
+                    self._stale = True
+
+                self._db.executemany("INSERT OR IGNORE INTO candidate_skills (skill, candidate_id) VALUES (?, ?)",
+                                     [(skill, candidate_id) for skill in skills])
+                self.candidates[candidate_id] = {"filename": filename, "parsed": parsed}
+                ids.append(candidate_id)
+        return ids
+
+    # Rank the stored pool against a parsed JD; returns (candidate_id, score) best first
+    def search(self, main_parsed: dict, limit: int) -> List[Tuple[int, float]]:
+        import numpy as np
+        with self._lock:
+            if self._stale:
+                self._build()
+            if not self.row_ids or limit <= 0:
+                return []
+            scores = self.matrix.score({**main_parsed, "skills": list(canonical_skills(main_parsed.get("skills", [])))}).round(2)
+            # Only rows scoring at least the `limit`-th best get sorted; all of them, so ties at the
+            # cutoff are settled by candidate ID like every other tie
+            if limit < len(scores):
+                cutoff = -np.partition(-scores, limit - 1)[limit - 1]
+                top = np.flatnonzero(scores >= cutoff)
+            else:
+                top = np.arange(len(scores))
+            ids = np.array([self.row_ids[row] for row in top])
+            top = top[np.lexsort((ids, -scores[top]))][:limit]
+            return [(self.row_ids[row], float(scores[row])) for row in top]
+
+
+_store: Optional[CandidateStore] = None
+
+# Shared candidate store, opened on first use; None when disabled
+def get_candidate_store() -> Optional[CandidateStore]:
+    global _store
+    if _store is None and CANDIDATE_STORE_ENABLED:
+        _store = CandidateStore(CANDIDATE_STORE_DB)
+    return _store
@@ -0,0 +1,118 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional, Tuple
+from app.utils.config import PROMPT_COMPACTION_ENABLED, PROMPT_MAX_TOKENS
+from app.utils.llm_scheduler import estimate_tokens
+from app.utils.metrics import PROMPT_DOCUMENT_TOKENS
+
+# Sections that never carry experience, education, skills, titles or company names
+DROPPED_SECTIONS = {
+    "references", "referees", "references available on request", "hobbies", "interests", "hobbies and interests",
+    "personal details", "personal information", "personal data", "declaration", "acknowledgements",
+    "how to apply", "to apply", "equal opportunity", "equal opportunity employer", "equal opportunity statement",
+    "benefits", "perks", "perks and benefits", "benefits and perks", "what we offer", "why join us",
+}
+# Sections kept whole before anything else when the document has to be cut to the token cap
+PRIORITY_SECTIONS = {
+    "summary", "professional summary", "profile", "objective", "career objective",
+    "skills", "technical skills", "key skills", "core skills", "core competencies", "technologies", "tools",
+    "tech stack", "education", "academic background", "qualifications", "certifications", "certificates",
+    "licenses and certifications", "requirements", "required skills", "preferred qualifications",
+}
+# Other headings that start a kept section (and so end a dropped one)
+KEPT_SECTIONS = PRIORITY_SECTIONS | {
+    "experience", "work experience", "professional experience", "employment history", "work history",
+    "career history", "projects", "key projects", "internships", "responsibilities", "key responsibilities",
+    "about the role", "the role", "about us", "about the company", "achievements", "awards", "publications",
+    "training", "courses", "languages", "volunteering", "volunteer experience", "job description",
+}
+
+SPACES_RE = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+CONTROL_RE = re.compile(r"[\x00-\x08\x0b-\x1f\x7f]")
+# "3", "Page 3", "Page 3 of 5", "3/5", "- 3 -"
+PAGE_NUMBER_RE = re.compile(r"^[-–\s]*(?:page\s*)?\d{1,3}(?:\s*(?:of|/)\s*\d{1,3})?[-–\s]*$", re.IGNORECASE)
+HEADING_RE = re.compile(r"^[\W\d_]*([a-z][a-z &/]*?)\s*:?$")
+
+
+# Lower-cased heading name if the line is a section heading: a known name, or any short all-caps line
+def section_heading(line: str) -> Optional[str]:
+    if len(line) > 40:
+        return None
+    match = HEADING_RE.match(line.lower())
+    if not match:
+        return None
+    name = " ".join(match.group(1).replace("&", " and ").replace("/", " and ").split())
+    if name in DROPPED_SECTIONS or name in KEPT_SECTIONS or (line.isupper() and len(name) > 2):
+        return name
+    return None
+
+# Collapse runs of spaces, drop control characters, blank lines and page numbers
+def normalize_lines(text: str) -> List[str]:
+    lines = []
+    for line in CONTROL_RE.sub("\n", text).splitlines():
+        line = SPACES_RE.sub(" ", line).strip()
+        if line and not PAGE_NUMBER_RE.match(line):
+            lines.append(line)
+    return lines
+
+# Split into (heading, lines) sections; text before the first heading has no heading
+def split_sections(lines: List[str]) -> List[Tuple[Optional[str], List[str]]]:
+    sections = [(None, [])]
+    for line in lines:
+        heading = section_heading(line)
+        if heading:
+            sections.append((heading, [line]))
+        else:
+            sections[-1][1].append(line)
+    return sections
+
+# Keep whole sections by priority until the budget runs out, cutting the first one that doesn't fit
+# at a line boundary and dropping everything after it; the kept text stays in document order
+def fit_to_budget(sections: List[Tuple[Optional[str], List[str]]], max_chars: int) -> List[List[str]]:
+    kept: List[List[str]] = [[] for _ in sections]
+    order = sorted(range(len(sections)), key=lambda i: sections[i][0] is not None and sections[i][0] not in PRIORITY_SECTIONS)
+    used = 0
+    for i in order:
+        for line in sections[i][1]:
+            if used + len(line) + 1 > max_chars:
+                return kept
+            kept[i].append(line)
+            used += len(line) + 1
+    return kept
+
+# Shrink an extracted document before it goes into a parsing prompt: normalized whitespace, no page
+# numbers or lines repeated across pages (headers, footers), no irrelevant sections, and at most
+# `max_tokens` estimated tokens. Pages are separated by form feeds; repeats within a page are kept.
+@lru_cache(maxsize=256)
+def compact_document(text: str, max_tokens: int = PROMPT_MAX_TOKENS) -> str:
+    if not PROMPT_COMPACTION_ENABLED:
+        return text
+
+    pages = [normalize_lines(page) for page in text.split("\f")]
+    # Lines found on more than one page are running headers and footers; only their first copy stays
+    page_counts = Counter(key for lines in pages for key in {line.lower() for line in lines})
+    running = {key for key, count in page_counts.items() if count > 1}
+
+    sections, seen = [], set()
+    for heading, lines in split_sections([line for lines in pages for line in lines]):
+        if heading in DROPPED_SECTIONS:
+            continue
+        unique = []
+        for line in lines:
+            key = line.lower()
+            if key in running:
+                if key in seen:
+                    continue
+                seen.add(key)
+            unique.append(line)
+        if unique:
+            sections.append((heading, unique))
+
+    compacted = "\n".join(line for _, lines in sections for line in lines)
+    if max_tokens and estimate_tokens(compacted) > max_tokens:
+        compacted = "\n".join(line for lines in fit_to_budget(sections, max_tokens * 4) for line in lines)
+
+    PROMPT_DOCUMENT_TOKENS.inc("original", amount=estimate_tokens(text))
+    PROMPT_DOCUMENT_TOKENS.inc("compacted", amount=estimate_tokens(compacted))
+    return compacted
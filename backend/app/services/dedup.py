@@ -0,0 +1,141 @@
+import re, threading, zlib
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Tuple
+from app.utils.config import DEDUP_ENABLED, DEDUP_THRESHOLD, DEDUP_MAX_DOCS
+
+# NumPy is imported on the first signature, so importing the app doesn't load it
+if TYPE_CHECKING:
+    import numpy as np
+
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.6 Jaccard almost always share a bucket, then get verified
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# Shingles hashed per step, so huge documents don't build one giant hash matrix
+CHUNK_SIZE = 4096
+
+_PRIME = (1 << 31) - 1
+
+WORD_RE = re.compile(r"\w+")
+
+_seen: Dict[str, "DuplicateIndex"] = {}
+_seen_lock = threading.Lock()
+
+
+# Coefficients of the NUM_PERM universal hashes (a * x + b) % _PRIME, fixed across processes
+@lru_cache(maxsize=1)
+def permutations() -> Tuple["np.ndarray", "np.ndarray"]:
+    import numpy as np
+    rng = np.random.RandomState(1)
+    return rng.randint(1, _PRIME, NUM_PERM).astype(np.uint64), rng.randint(0, _PRIME, NUM_PERM).astype(np.uint64)
+
+# Hashed word 5-grams of the lowercased text; layout and punctuation differences between formats drop out
+def shingles(text: str) -> "np.ndarray":
+    import numpy as np
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        grams = {" ".join(words)}
+    else:
+        grams = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(gram.encode("utf-8")) & _PRIME for gram in grams), dtype=np.uint64, count=len(grams))
+
+# MinHash signature: the minimum of NUM_PERM universal hashes over the shingles
+def minhash(text: str) -> "np.ndarray":
+    import numpy as np
+    a, b = permutations()
+    hashes = shingles(text)
+    signature = np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    for start in range(0, len(hashes), CHUNK_SIZE):
+        chunk = hashes[start:start + CHUNK_SIZE]
+        signature = np.minimum(signature, ((np.outer(a, chunk) + b[:, None]) % _PRIME).min(axis=1))
+    return signature
+
+# Estimated Jaccard similarity of two signatures
+def similarity(a: "np.ndarray", b: "np.ndarray") -> float:
+    return float((a == b).sum()) / NUM_PERM
+
+
+class DuplicateIndex:
+    # LSH buckets over MinHash signatures; optionally keeps only the max_docs most recently used
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, max_docs: int = 0):
+        self.threshold = threshold
+        self.max_docs = max_docs
+        self._entries = OrderedDict()
+        self._buckets = defaultdict(set)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bands(signature: "np.ndarray") -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # Most similar indexed document at or above the threshold, as (key, value)
+    def query(self, signature: "np.ndarray") -> Optional[Tuple[Hashable, Any]]:
+        with self._lock:
+            candidates = set()
+            for band in self._bands(signature):
+                candidates |= self._buckets.get(band, set())
+            best, best_similarity = None, self.threshold
+            for key in candidates:
+                score = similarity(signature, self._entries[key][0])
+                if score >= best_similarity:
+                    best, best_similarity = key, score
+            if best is None:
+                return None
+            self._entries.move_to_end(best)
+            return best, self._entries[best][1]
+
+    def add(self, key: Hashable, signature: "np.ndarray", value: Any = None):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (signature, value)
+            for band in self._bands(signature):
+                self._buckets[band].add(key)
+            # Forget the least recently matched documents once we are over capacity
+            while self.max_docs and len(self._entries) > self.max_docs:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: Hashable):
+        signature, _ = self._entries.pop(key)
+        for band in self._bands(signature):
+            bucket = self._buckets[band]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band]
+
+
+# Previously parsed documents for one parse mode, shared across requests; None when disabled
+def get_seen_index(parse_mode: str) -> Optional[DuplicateIndex]:
+    if not DEDUP_ENABLED:
+        return None
+    with _seen_lock:
+        if parse_mode not in _seen:
+            _seen[parse_mode] = DuplicateIndex(DEDUP_THRESHOLD, DEDUP_MAX_DOCS)
+        return _seen[parse_mode]
+
+# Group a batch of texts: each one is unique, a near-duplicate of an earlier document in the batch,
+# or a near-duplicate of a document parsed before. Returns the signatures, a map of batch duplicates
+# to their representative, and a map of documents to the seen entry they match.
+def find_duplicates(texts: List[Optional[str]], seen: Optional[DuplicateIndex]) -> Tuple[List[Optional["np.ndarray"]], Dict[int, int], Dict[int, Any]]:
+    signatures = [minhash(text) if DEDUP_ENABLED and text is not None else None for text in texts]
+    representatives: Dict[int, int] = {}
+    seen_matches: Dict[int, Any] = {}
+    batch = DuplicateIndex(DEDUP_THRESHOLD)
+    for i, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        match = batch.query(signature)
+        if match is not None:
+            representatives[i] = match[0]
+            continue
+        match = seen.query(signature) if seen is not None else None
+        if match is not None:
+            seen_matches[i] = match[1]
+            continue
+        batch.add(i, signature)
+    return signatures, representatives, seen_matches
@@ -0,0 +1,69 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.utils.config import EXTRACTION_WORKERS, EXTRACTION_TIMEOUT
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Lazily start the shared extraction process pool
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _pool
+
+# Stop worker processes on app shutdown
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+# Kill a pool's workers outright, e.g. one stuck on a document that never finishes; futures still
+# running on it fail with BrokenProcessPool
+def _terminate_pool(pool: ProcessPoolExecutor):
+    global _pool
+    if _pool is pool:
+        _pool = None
+    for process in list((pool._processes or {}).values()):
+        process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Runs in a worker process; errors are returned as text because HTTPException doesn't pickle
+def _extract_worker(content: bytes, suffix: str):
+    from app.services.file_processing import extract_text_from_buffer
+    try:
+        return extract_text_from_buffer(content, suffix), None
+    except HTTPException as e:
+        return None, e.detail
+
+# Extract text from file content in the process pool with a per-document timeout
+async def run_extraction(content: bytes, suffix: str, timeout: float = EXTRACTION_TIMEOUT, retry: bool = True) -> str:
+    global _pool
+    if EXTRACTION_WORKERS <= 0:
+        # Pool disabled: extract in a thread instead
+        text, error = await run_in_threadpool(_extract_worker, content, suffix)
+    else:
+        loop = asyncio.get_running_loop()
+        pool = get_pool()
+        try:
+            text, error = await asyncio.wait_for(loop.run_in_executor(pool, _extract_worker, content, suffix), timeout)
+        except asyncio.TimeoutError:
+            # A hung worker would hold its slot forever, so the whole pool goes and a fresh one starts next time
+            _terminate_pool(pool)
+            raise HTTPException(status_code=400, detail=f"Text extraction failed: timed out after {timeout:g}s")
+        except BrokenProcessPool:
+            if _pool is not pool and retry:
+                # Torn down because of another document's timeout, not this one: try once more
+                return await run_extraction(content, suffix, timeout, retry=False)
+            # A worker died (e.g. crashed on a malformed file); start a fresh pool next time
+            if _pool is pool:
+                _pool = None
+            raise HTTPException(status_code=400, detail="Text extraction failed: extraction worker crashed")
+
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
+    return text
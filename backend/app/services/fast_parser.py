@@ -0,0 +1,98 @@
+import os, re
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+from app.services.normalize import EXPERIENCE_RE, DEGREE_PATTERNS, normalize_parsed
+
+SKILLS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "skills.txt")
+
+# Tokens keep the characters that matter in skill names (C++, C#, .NET, Node.js)
+TOKEN_RE = re.compile(r"[a-z0-9+#.]+")
+
+_END = "$"
+_skill_trie = None
+
+
+# Lowercased tokens with trailing sentence dots removed
+def tokenize(text: str) -> List[str]:
+    return [token for token in (t.rstrip(".") for t in TOKEN_RE.findall(text.lower())) if token]
+
+# Compile the skill dictionary into a token trie; each alias maps to its canonical name
+def build_skill_trie(path: str = SKILLS_FILE) -> dict:
+    trie = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            names = [name.strip() for name in line.split("|")]
+            for alias in names:
+                node = trie
+                for token in tokenize(alias):
+                    node = node.setdefault(token, {})
+                node[_END] = names[0]
+    return trie
+
+def get_skill_trie() -> dict:
+    global _skill_trie
+    if _skill_trie is None:
+        _skill_trie = build_skill_trie()
+    return _skill_trie
+
+# Find dictionary skills in the text, taking the longest match at each position
+def match_skills(text: str) -> List[str]:
+    trie = get_skill_trie()
+    tokens = tokenize(text)
+    found = {}
+    i = 0
+    while i < len(tokens):
+        node, match, end = trie, None, i + 1
+        for j in range(i, len(tokens)):
+            node = node.get(tokens[j])
+            if node is None:
+                break
+            if _END in node:
+                match, end = node[_END], j + 1
+        if match:
+            found[match] = None
+            i = end
+        else:
+            i += 1
+    return list(found)
+
+# Canonical dictionary name for a skill that is exactly one of its aliases ("k8s" -> "Kubernetes");
+# anything else comes back as given, so LLM and local parses use the same names. Memoized: the
+# candidate store maps every stored skill on startup, and distinct skill names are few.
+@lru_cache(maxsize=8192)
+def canonical_skill(skill: str) -> str:
+    node = get_skill_trie()
+    for token in tokenize(skill):
+        node = node.get(token)
+        if node is None:
+            return skill.strip()
+    return node.get(_END, skill.strip())
+
+# First experience phrase in the text, verbatim
+def match_experience(text: str) -> str:
+    match = EXPERIENCE_RE.search(text)
+    return match.group(0) if match else ""
+
+# Highest degree mentioned in the text, verbatim
+def match_education(text: str) -> str:
+    for _, pattern in DEGREE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(0)
+    return ""
+
+# Parse a document locally; returns the parsed dict and a 0-1 confidence
+def fast_parse(text: str) -> Tuple[Dict[str, Any], float]:
+    parsed = normalize_parsed({
+        "experience": match_experience(text),
+        "education": match_education(text),
+        "skills": match_skills(text),
+        "job_title": "",
+        "company_name": ""
+    })
+    # Skills carry most of the match score, so they dominate the confidence
+    confidence = 0.6 * min(len(parsed["skills"]) / 5, 1.0) + 0.2 * bool(parsed["experience"]) + 0.2 * bool(parsed["education"])
+    return parsed, round(confidence, 2)
@@ -1,25 +1,84 @@
-import docx2txt, fitz, textract
-from fastapi import HTTPException
+import hashlib, io, os, tempfile
+from typing import Optional
+from fastapi import HTTPException, UploadFile
 from app.utils.config import *
+from app.utils.cache import TieredCache, make_key, register_cache_metrics
+from app.utils.metrics import timed
+from app.services.extraction_pool import run_extraction
 
-# Extract text from supported JD file formats
-def extract_text_from_file(file_path: str) -> str:
+# Cache of uploaded file content hash -> extracted text, opened on first use
+_extraction_cache: Optional[TieredCache] = None
+_extraction_cache_opened = False
+
+# The extraction cache, or None when disabled
+def get_extraction_cache() -> Optional[TieredCache]:
+    global _extraction_cache, _extraction_cache_opened
+    if not _extraction_cache_opened:
+        _extraction_cache_opened = True
+        if EXTRACTION_CACHE_ENABLED:
+            _extraction_cache = TieredCache(
+                EXTRACTION_CACHE_MAX_BYTES, EXTRACTION_CACHE_TTL,
+                EXTRACTION_CACHE_DB or None, EXTRACTION_CACHE_DISK_TTL, EXTRACTION_CACHE_DISK_MAX_ENTRIES
+            )
+            register_cache_metrics("extraction", _extraction_cache)
+    return _extraction_cache
+
+# Read an upload in chunks, rejecting files over the configured size limit
+async def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytearray:
+    content = bytearray()
+    with timed("upload_read"):
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            content += chunk
+            if len(content) > max_bytes:
+                raise HTTPException(status_code=413, detail=f"{file.filename} exceeds the {max_bytes} byte upload limit")
+    return content
+
+# Extract text from supported JD file formats held in memory; each format's library is only
+# imported the first time such a file shows up
+def extract_text_from_buffer(content: bytes, suffix: str) -> str:
     try:
-        if file_path.endswith(".docx"):
+        if suffix == ".docx":
             # Extract text from .docx
-            return docx2txt.process(file_path).strip()
-        elif file_path.endswith(".pdf"):
-            # Extract text from PDF
-            with fitz.open(file_path) as doc:
-                return "".join([page.get_text() for page in doc]).strip()
-        elif file_path.endswith(".doc"):
-            # Extract text from legacy .doc
-            return textract.process(file_path).decode("utf-8").strip()
-        elif file_path.endswith(".txt"):
+            import docx2txt
+            return docx2txt.process(io.BytesIO(content)).strip()
+        elif suffix == ".pdf":
+            # Extract text from PDF; pages are separated by form feeds, as textract does
+            import fitz
+            with fitz.open(stream=content, filetype="pdf") as doc:
+                return "\f".join([page.get_text() for page in doc]).strip()
+        elif suffix == ".doc":
+            # textract only reads from a path, so legacy .doc spills to a temp file
+            import textract
+            with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+                tmp.write(content)
+                tmp.flush()
+                return textract.process(tmp.name).decode("utf-8").strip()
+        elif suffix == ".txt":
             # Read plain text
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read().strip()
+            return bytes(content).decode("utf-8").strip()
         return ""
     except Exception as e:
         # Handle text extraction errors
-        raise HTTPException(status_code=400, detail=f"Text extraction failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=f"Text extraction failed: {str(e)}")
+
+# Extract text from supported JD file formats
+def extract_text_from_file(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return extract_text_from_buffer(f.read(), os.path.splitext(file_path)[1].lower())
+
+# Extract text from uploaded file content in the extraction pool, reusing the result for identical bytes
+async def extract_text_from_bytes(content: bytes, filename: str) -> str:
+    suffix = os.path.splitext(filename)[1].lower()
+    extraction_cache = get_extraction_cache()
+    key = make_key(suffix, hashlib.sha256(content).hexdigest()) if extraction_cache else None
+    if key:
+        cached = extraction_cache.get(key)
+        if cached is not None:
+            return cached
+
+    with timed("extract"):
+        text = await run_extraction(content, suffix)
+
+    if key:
+        extraction_cache.set(key, text)
+    return text
@@ -1,11 +1,12 @@
 from app.models.schemas import EmailGenerationRequest
+from string import Template
 from fastapi import HTTPException
-from app.utils.config import *
+from app.utils.llm_client import generate_content
 from app.services.prompts import *
 
 
 # Generate personalized interview call email using Gemini
-def generate_interview_email(request: EmailGenerationRequest) -> str:
+async def generate_interview_email(request: EmailGenerationRequest) -> str:
     job_title = request.job_title or "this position"
     company_name = request.company_name or "our company"
     candidate_name = request.candidate_name
@@ -16,13 +17,13 @@ def generate_interview_email(request: EmailGenerationRequest) -> str:
     prompt = generate_interview_email_prompt(candidate_name, job_title, company_name, match_score, candidate_skills, missing_skills)
 
     try:
-        response = gemini.generate_content(prompt)
-        return response.text.strip()
+        response = await generate_content(prompt, lane="bulk")
+        return response.strip()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Interview email generation failed: {str(e)}")
 
 # Generate polite rejection email using Gemini
-def generate_rejection_email(request: EmailGenerationRequest) -> str:
+async def generate_rejection_email(request: EmailGenerationRequest) -> str:
     job_title = request.job_title or "this position"
     company_name = request.company_name or "our company"
     candidate_name = request.candidate_name
@@ -32,7 +33,86 @@ def generate_rejection_email(request: EmailGenerationRequest) -> str:
     prompt = generate_rejection_email_prompt(candidate_name, job_title, company_name, match_score, candidate_skills)
     
     try:
-        response = gemini.generate_content(prompt)
-        return response.text.strip()
+        response = await generate_content(prompt, lane="bulk")
+        return response.strip()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Rejection email generation failed: {str(e)}")
+
+INTERVIEW_TEMPLATE = Template("""Subject: Interview invitation for $the_role$at_company
+
+Dear $candidate_name,
+
+Thank you for applying for $the_position$at_company. We were impressed by your background$skills_clause, and we would like to invite you to an interview.
+$personal_paragraph
+Please reply with a few times that suit you over the coming week, and we will send a calendar invitation with the details.
+
+We look forward to speaking with you.
+
+Best regards,
+$team""")
+
+REJECTION_TEMPLATE = Template("""Subject: Your application for $the_role$at_company
+
+Dear $candidate_name,
+
+Thank you for your interest in $the_role$at_company and for the time you spent applying.
+$personal_paragraph
+After careful review, we have decided to move forward with another candidate whose experience more closely matches the current needs of the role.
+
+We encourage you to apply for future openings that fit your background.
+
+Best regards,
+$team""")
+
+
+# Render an email locally from the request fields, with an optional personalized sentence;
+# a missing job title or company name is worded around rather than filled with a placeholder
+def render_email(request: EmailGenerationRequest, personal_line: str = "") -> str:
+    skills = request.candidate_skills[:3]
+    if len(skills) > 1:
+        skills_clause = f" in {', '.join(skills[:-1])} and {skills[-1]}"
+    else:
+        skills_clause = f" in {skills[0]}" if skills else ""
+
+    job_title = (request.job_title or "").strip()
+    company_name = (request.company_name or "").strip()
+    template = INTERVIEW_TEMPLATE if request.is_best_match else REJECTION_TEMPLATE
+    return template.substitute(
+        the_role=f"the {job_title} role" if job_title else "the role",
+        the_position=f"the {job_title} position" if job_title else "the position",
+        at_company=f" at {company_name}" if company_name else "",
+        team=f"{company_name} Recruiting Team" if company_name else "The Recruiting Team",
+        candidate_name=request.candidate_name,
+        skills_clause=skills_clause,
+        personal_paragraph=f"\n{personal_line}\n" if personal_line else ""
+    )
+
+# One personalized sentence from Gemini for an otherwise templated email
+async def generate_personalized_line(request: EmailGenerationRequest) -> str:
+    prompt = personalized_line_prompt(
+        request.candidate_name,
+        request.job_title or "this position",
+        request.company_name or "our company",
+        ", ".join(request.candidate_skills[:5]) or "None listed",
+        request.is_best_match
+    )
+    response = await generate_content(prompt, lane="bulk")
+    # Keep only the first line, without wrapping quotes
+    return response.strip().splitlines()[0].strip().strip('"') if response.strip() else ""
+
+# Build an email in the given mode: "template" (local only), "personalized" (template plus one
+# Gemini sentence) or "llm" (whole email from Gemini)
+async def compose_email(request: EmailGenerationRequest, email_mode: str) -> str:
+    if email_mode == "llm":
+        if request.is_best_match:
+            return await generate_interview_email(request)
+        return await generate_rejection_email(request)
+
+    personal_line = ""
+    if email_mode == "personalized":
+        try:
+            personal_line = await generate_personalized_line(request)
+        except Exception:
+            # The template alone is still a complete email
+            personal_line = ""
+    return render_email(request, personal_line)
@@ -1,45 +1,277 @@
-import json
-from typing import Dict, Any
+import asyncio, json, re
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
 from fastapi import HTTPException
-from app.utils.config import *
+from app.utils.llm_client import generate_content, invalidate, stream_content
+from app.utils.llm_scheduler import estimate_tokens
+from app.utils.config import PARSE_BATCH_SIZE, PARSE_BATCH_TOKENS, LLM_STRUCTURED_OUTPUT, PARSE_RETRIES
+from app.utils.metrics import PARSE_OUTPUTS
 from app.services.prompts import *
+from app.services.normalize import normalize_parsed
+from app.services.compaction import compact_document
+from app.services.fast_parser import canonical_skill
 
 # Generate JD using Gemini with input prompt
-def generate_jd_with_gemini(prompt: str) -> str:
+async def generate_jd_with_gemini(prompt: str) -> str:
     try:
         # Generate and return cleaned JD content
-        response = gemini.generate_content(prompt)
-        return response.text.strip()
+        response = await generate_content(prompt, lane="interactive")
+        return response.strip()
     except Exception as e:
         # Handle Gemini API errors
         raise HTTPException(status_code=500, detail=f"JD generation failed: {str(e)}")
 
-# Parse JD text to extract structured data like skills, education, experience
-def parse_jd_with_gemini(text: str) -> Dict[str, Any]:
-    prompt = parse_jd_with_gemini_prompt(text)
+# Stream JD content from Gemini as it is generated
+async def stream_jd_with_gemini(prompt: str) -> AsyncIterator[str]:
+    try:
+        async for chunk in stream_content(prompt):
+            yield chunk
+    except Exception as e:
+        # Handle Gemini API errors
+        raise HTTPException(status_code=500, detail=f"JD generation failed: {str(e)}")
+
+# Strip markdown fences around a JSON response if present
+def strip_json_fences(text: str) -> str:
+    json_str = text.strip()
+    if json_str.startswith("```json"):
+        json_str = json_str[7:]
+    elif json_str.startswith("```"):
+        json_str = json_str[3:]
+    if json_str.endswith("```"):
+        json_str = json_str[:-3]
+    return json_str
+
+# Ways models commonly break JSON: trailing commas and typographic quotes
+TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+# Start positions tried in a noisy reply before giving up
+MAX_JSON_STARTS = 20
+
+def repair_json(text: str) -> str:
+    return TRAILING_COMMA_RE.sub(r"\1", text.replace("\u201c", '"').replace("\u201d", '"'))
+
+# Every JSON object that decodes on its own, e.g. the complete entries of a truncated array
+def salvage_objects(text: str) -> List[dict]:
+    decoder, objects = json.JSONDecoder(), []
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, end = decoder.raw_decode(text, start)
+            objects.append(value)
+            start = text.find("{", end)
+        except ValueError:
+            start = text.find("{", start + 1)
+    return objects
+
+# A JSON value cut off mid-way (e.g. at the output token limit), trimmed back to its last complete
+# member (up to a comma or a closed nested value) and closed; None if the value starting at
+# `start` isn't truncated
+def close_truncated(text: str, start: int) -> Optional[str]:
+    closers, in_string, escaped, cut = [], False, False, None
+    for i in range(start, len(text)):
+        char = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not closers or closers.pop() != char or not closers:
+                return None
+            cut = (i + 1, closers[:])
+        elif char == ",":
+            cut = (i, closers[:])
+    if cut is None:
+        return None
+    end, open_closers = cut
+    return text[start:end] + "".join(reversed(open_closers))
+
+# Position of the first `opener` outside any string or bracket, e.g. the batch array rather than
+# a skills list inside it; -1 if there is none
+def top_level_start(text: str, opener: str) -> int:
+    depth, in_string, escaped = 0, False, False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == opener and depth == 0:
+            return i
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth = max(0, depth - 1)
+    return -1
+
+# Whether a decoded value has the shape we asked for; arrays only count when they hold objects,
+# and an empty array is never a valid batch reply
+def _is_expected(value: Any, expected: type) -> bool:
+    if expected is list:
+        return isinstance(value, list) and bool(value) and all(isinstance(item, dict) for item in value)
+    return isinstance(value, expected)
+
+# The JSON value starting at `start`, closed first if it was cut off; None if neither decodes
+def _decode_at(decoder: json.JSONDecoder, text: str, start: int) -> Any:
+    try:
+        return decoder.raw_decode(text, start)[0]
+    except ValueError:
+        closed = close_truncated(text, start)
+    try:
+        return json.loads(closed) if closed else None
+    except ValueError:
+        return None
 
+# First JSON value of the expected type in a model reply, and whether it had to be dug out of
+# fences, prose or broken syntax. Only the top-level value counts, as written and then repaired;
+# an object is also looked for at later offsets, while an array never is, since inner arrays
+# (skills lists) are not batch replies. A truncated object keeps its complete members and a
+# truncated array its complete objects. Raises ValueError when nothing usable is left.
+def recover_json(text: str, expected: type = dict) -> Tuple[Any, bool]:
     try:
-        # Call Gemini model to parse JD
-        response = gemini.generate_content(prompt)
-        json_str = response.text.strip()
+        value = json.loads(strip_json_fences(text))
+        if _is_expected(value, expected):
+            return value, False
+    except ValueError:
+        pass
 
-        # Strip markdown fences if present
-        if json_str.startswith("```json"):
-            json_str = json_str[7:]
-        elif json_str.startswith("```"):
-            json_str = json_str[3:]
-        if json_str.endswith("```"):
-            json_str = json_str[:-3]
+    decoder = json.JSONDecoder()
+    opener = "{" if expected is dict else "["
+    repaired = repair_json(text)
+    for candidate in (text, repaired):
+        start = top_level_start(candidate, opener)
+        if start != -1:
+            try:
+                value, _ = decoder.raw_decode(candidate, start)
+                if _is_expected(value, expected):
+                    return value, True
+            except ValueError:
+                pass
 
-        # Convert to dict and clean
-        parsed = json.loads(json_str)
-        parsed["skills"] = list(set(parsed.get("skills", [])))
-        parsed["experience"] = parsed.get("experience", "")
-        parsed["education"] = parsed.get("education", "")
-        parsed["job_title"] = parsed.get("job_title", "")
-        parsed["company_name"] = parsed.get("company_name", "")
-        return parsed
+    if expected is dict:
+        # Each start is decoded or else closed as truncated, outermost first, so a cut-off object
+        # keeps its members instead of yielding one of its inner objects
+        for candidate in (repaired, text):
+            start, tried = top_level_start(candidate, opener), 0
+            while start != -1 and tried < MAX_JSON_STARTS:
+                value = _decode_at(decoder, candidate, start)
+                if _is_expected(value, expected):
+                    return value, True
+                start, tried = candidate.find(opener, start + 1), tried + 1
+    else:
+        # Whatever complete entries a broken or truncated array still holds
+        objects = salvage_objects(repaired)
+        if objects:
+            return objects, True
+    raise ValueError(f"No JSON {expected.__name__} in model output: {text[:200]!r}")
+
+# Decode a parsing reply, counting clean, recovered and unusable outputs
+def parse_output(text: str, expected: type) -> Any:
+    try:
+        value, recovered = recover_json(text, expected)
+    except ValueError:
+        PARSE_OUTPUTS.inc("failed")
+        raise
+    PARSE_OUTPUTS.inc("recovered" if recovered else "clean")
+    return value
+
+# Fill in missing fields, map skills to their canonical names and de-duplicate them, and
+# normalize experience/education of a parsed document
+def clean_parsed(parsed: dict) -> Dict[str, Any]:
+    skills = parsed.get("skills") or []
+    if isinstance(skills, str):
+        skills = skills.split(",")
+    parsed["skills"] = list({canonical_skill(skill) for skill in skills if isinstance(skill, str) and skill.strip()})
+    parsed["experience"] = parsed.get("experience", "")
+    parsed["education"] = parsed.get("education", "")
+    parsed["job_title"] = parsed.get("job_title", "")
+    parsed["company_name"] = parsed.get("company_name", "")
+    return normalize_parsed(parsed)
+
+# Parse JD text to extract structured data like skills, education, experience; the model is only
+# asked again when its reply holds no recoverable JSON object
+async def parse_jd_with_gemini(text: str, lane: str = "default") -> Dict[str, Any]:
+    prompt = parse_jd_with_gemini_prompt(compact_document(text))
+    schema = PARSED_DOCUMENT_SCHEMA if LLM_STRUCTURED_OUTPUT else None
+
+    try:
+        for attempt in range(PARSE_RETRIES + 1):
+            # Call Gemini model to parse JD
+            response = await generate_content(prompt, lane=lane, response_schema=schema)
+            try:
+                # Convert to dict and clean
+                return clean_parsed(parse_output(response, dict))
+            except ValueError:
+                # Don't keep serving a response we couldn't parse
+                invalidate(prompt, schema)
+                if attempt == PARSE_RETRIES:
+                    raise
 
     except Exception as e:
         # Handle parsing errors
         raise HTTPException(status_code=500, detail=f"JD parsing failed: {str(e)}")
+
+# Group documents into batches of at most max_docs within a token budget; returns index lists
+def pack_batches(texts: List[str], max_docs: int = PARSE_BATCH_SIZE, token_budget: int = PARSE_BATCH_TOKENS) -> List[List[int]]:
+    batches, current, used = [], [], 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(compact_document(text))
+        if current and (len(current) >= max_docs or used + tokens > token_budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+# Parse several documents in one Gemini call; failed documents come back as exceptions in place
+async def parse_batch_with_gemini(texts: List[str], lane: str = "bulk") -> List[Union[Dict[str, Any], Exception]]:
+    if len(texts) == 1:
+        try:
+            return [await parse_jd_with_gemini(texts[0], lane)]
+        except Exception as e:
+            return [e]
+
+    prompt = parse_batch_with_gemini_prompt([compact_document(text) for text in texts])
+    schema = PARSED_BATCH_SCHEMA if LLM_STRUCTURED_OUTPUT else None
+    results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+
+    try:
+        response = await generate_content(prompt, lane=lane, response_schema=schema)
+        items = parse_output(response, list)
+        for item in items:
+            index = item.get("index") if isinstance(item, dict) else None
+            if isinstance(index, int) and 0 <= index < len(texts) and results[index] is None:
+                parsed = item.get("parsed")
+                if isinstance(parsed, dict):
+                    results[index] = clean_parsed(parsed)
+    except Exception:
+        # Malformed or failed batch: everything below is retried in smaller batches
+        pass
+
+    missing = [i for i, parsed in enumerate(results) if parsed is None]
+    if not missing:
+        return results
+
+    invalidate(prompt, schema)
+    if len(missing) == len(texts):
+        # Nothing usable came back, so split the batch in half
+        groups = [missing[:len(missing) // 2], missing[len(missing) // 2:]]
+    else:
+        # Keep the documents that parsed and retry only the rest
+        groups = [missing]
+
+    retried = await asyncio.gather(*(parse_batch_with_gemini([texts[i] for i in group], lane) for group in groups))
+    for group, group_results in zip(groups, retried):
+        for i, parsed in zip(group, group_results):
+            results[i] = parsed
+    return results
@@ -1,4 +1,5 @@
 from typing import List, Dict
+from app.services.normalize import normalized, meets_experience
 
 # Identify missing skills and generate remarks
 def analyze_gap(main: dict, other: dict) -> dict:
@@ -12,9 +13,17 @@ def analyze_gap(main: dict, other: dict) -> dict:
         # If all required skills are present
         remarks.append("All required skills are covered.")
 
-    if main.get("experience") != other.get("experience"):
+    required = normalized(main, "experience_years")
+    found = normalized(other, "experience_years")
+    if required is not None and found is not None:
+        # Compare normalized years when both sides have them, by the same rule as the score
+        experience_mismatch = not meets_experience(required, found)
+    else:
+        experience_mismatch = main.get("experience") != other.get("experience")
+
+    if experience_mismatch:
         # Highlight experience mismatch
-        remarks.append(f"Experience mismatch: Expected {main['experience']} but found {other['experience']}.")
+        remarks.append(f"Experience mismatch: Expected {main.get('experience')} but found {other.get('experience')}.")
 
     return {
         "missing_skills": missing_skills,
@@ -0,0 +1,372 @@
+import asyncio, json, os, socket, sqlite3, threading, time, uuid
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.utils.config import JOBS_DB, JOB_WORKERS, JOB_CHUNK_SIZE, JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL, JOB_RETENTION, JOB_LEASE_TIMEOUT
+from app.services.pipeline import apply_shortlist, process_resumes, parse_text
+from app.services.sessions import create_session, get_session
+
+# Job status: queued -> parsing (JD) -> running (resumes) -> done | failed
+# File status: pending -> running -> done | error
+# A parsing job or running file is leased to one worker (owner) that keeps its heartbeat fresh; once the
+# heartbeat is older than JOB_LEASE_TIMEOUT any worker may take the work over
+
+
+# Applies a job's shortlist cutoffs to its combined results once the last file is done
+def shortlister(options: dict, main_parsed: dict) -> Callable[[List[dict]], List[dict]]:
+    return lambda results: apply_shortlist(results, main_parsed, options.get("top_k"), options.get("min_score"))
+
+
+class JobStore:
+    # Durable queue of comparison jobs in SQLite (WAL); uploads stay in the DB until their file is processed
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            jd_text TEXT NOT NULL,
+            options TEXT NOT NULL,
+            main_parsed TEXT,
+            total INTEGER NOT NULL,
+            session_id TEXT,
+            error TEXT,
+            created REAL NOT NULL,
+            updated REAL NOT NULL,
+            owner TEXT,
+            heartbeat REAL
+        )""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS job_files (
+            job_id TEXT NOT NULL,
+            idx INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            content BLOB,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            owner TEXT,
+            heartbeat REAL,
+            PRIMARY KEY (job_id, idx)
+        )""")
+        # Databases created before leases were added
+        for table in ("jobs", "job_files"):
+            columns = {row[1] for row in self._db.execute(f"PRAGMA table_info({table})")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat", "REAL")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session_id)")
+        self.recover()
+
+    # Startup cleanup; work other workers hold is left alone and only taken over once its lease expires
+    def recover(self):
+        with self._lock:
+            # Jobs whose last chunk finished right before the worker went away
+            finished = self._db.execute("""SELECT id, options, main_parsed FROM jobs WHERE status = 'running' AND NOT EXISTS (
+                SELECT 1 FROM job_files WHERE job_id = jobs.id AND status IN ('pending', 'running')
+            )""").fetchall()
+        for job_id, options, main_parsed in finished:
+            self.finish_if_done(job_id, shortlister(json.loads(options), json.loads(main_parsed)))
+
+        with self._lock, self._db:
+            if JOB_RETENTION:
+                expired = "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated < ?"
+                cutoff = time.time() - JOB_RETENTION
+                self._db.execute(f"DELETE FROM job_files WHERE job_id IN ({expired})", (cutoff,))
+                self._db.execute(f"DELETE FROM jobs WHERE id IN ({expired})", (cutoff,))
+
+    def create(self, jd_text: str, files: List[Tuple[str, bytes]], options: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, jd_text, options, total, created, updated) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, jd_text, json.dumps(options), len(files), now, now)
+            )
+            self._db.executemany(
+                "INSERT INTO job_files (job_id, idx, filename, content, status) VALUES (?, ?, ?, ?, 'pending')",
+                [(job_id, i, filename, content) for i, (filename, content) in enumerate(files)]
+            )
+        return job_id
+
+    # Job status with per-file progress and the results finished so far
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._db.execute(
+                "SELECT status, options, main_parsed, total, session_id, error, created, updated FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            files = self._db.execute(
+                "SELECT filename, status, result FROM job_files WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+
+        status, options, main_parsed, total, session_id, error, created, updated = job
+        results = [json.loads(result) if result else {"filename": filename, "status": file_status}
+                   for filename, file_status, result in files]
+        finished = sum(file_status in ("done", "error") for _, file_status, _ in files)
+        return {
+            "job_id": job_id,
+            "status": status,
+            "options": json.loads(options),
+            "total_files": total,
+            "processed_files": finished,
+            "failed_files": sum(file_status == "error" for _, file_status, _ in files),
+            "progress": round(finished / total, 4) if total else 1.0,
+            "session_id": session_id,
+            "error": error,
+            "created": created,
+            "updated": updated,
+            "main_parsed": json.loads(main_parsed) if main_parsed else None,
+            "results": results
+        }
+
+    # Requeue work whose owner stopped sending heartbeats
+    def _expire_leases(self, now: float):
+        cutoff = now - JOB_LEASE_TIMEOUT
+        self._db.execute("UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'parsing' AND (heartbeat IS NULL OR heartbeat < ?)",
+                         (cutoff,))
+        self._db.execute("UPDATE job_files SET status = 'pending', owner = NULL WHERE status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)",
+                         (cutoff,))
+
+    # Keep the leases of everything this store's workers are processing
+    def heartbeat(self):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET heartbeat = ? WHERE owner = ? AND status = 'parsing'", (now, self.owner))
+            self._db.execute("UPDATE job_files SET heartbeat = ? WHERE owner = ? AND status = 'running'", (now, self.owner))
+
+    # Take the oldest job whose JD still needs parsing; a single UPDATE, so two workers never get the same job
+    def claim_jd(self) -> Optional[Tuple[str, str, dict]]:
+        now = time.time()
+        with self._lock, self._db:
+            self._expire_leases(now)
+            rows = self._db.execute(
+                """UPDATE jobs SET status = 'parsing', owner = ?, heartbeat = ?, updated = ? WHERE id = (
+                    SELECT id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1
+                ) AND status = 'queued' RETURNING id, jd_text, options""",
+                (self.owner, now, now)
+            ).fetchall()
+        if not rows:
+            return None
+        job_id, jd_text, options = rows[0]
+        return job_id, jd_text, json.loads(options)
+
+    def set_parsed(self, job_id: str, main_parsed: dict):
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET status = 'running', main_parsed = ?, updated = ? WHERE id = ?",
+                             (json.dumps(main_parsed), time.time(), job_id))
+
+    def fail(self, job_id: str, error: str):
+        with self._lock, self._db:
+            self._db.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                             (error, time.time(), job_id))
+            self._db.execute("UPDATE job_files SET content = NULL WHERE job_id = ?", (job_id,))
+
+    # Take up to `limit` pending files of the oldest running job
+    def claim_files(self, limit: int) -> Optional[Tuple[str, dict, str, dict, List[Tuple[int, str, bytes]]]]:
+        now = time.time()
+        with self._lock, self._db:
+            self._expire_leases(now)
+            row = self._db.execute(
+                """SELECT id, options, jd_text, main_parsed FROM jobs WHERE status = 'running' AND EXISTS (
+                    SELECT 1 FROM job_files WHERE job_id = jobs.id AND status = 'pending'
+                ) ORDER BY created LIMIT 1"""
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, options, jd_text, main_parsed = row
+            # The status check in the UPDATE itself keeps files another process claimed meanwhile out
+            files = self._db.execute(
+                """UPDATE job_files SET status = 'running', attempts = attempts + 1, owner = ?, heartbeat = ?
+                WHERE job_id = ? AND status = 'pending' AND idx IN (
+                    SELECT idx FROM job_files WHERE job_id = ? AND status = 'pending' ORDER BY idx LIMIT ?
+                ) RETURNING idx, filename, content, attempts""",
+                (self.owner, now, job_id, job_id, limit)
+            ).fetchall()
+
+            claimed = []
+            for idx, filename, content, attempts in sorted(files):
+                # A file that keeps taking the worker down is given up on instead of retried forever
+                if attempts > JOB_MAX_ATTEMPTS:
+                    self._finish_file(job_id, idx, "error", {
+                        "filename": filename, "error": f"Processing was interrupted {attempts - 1} times."
+                    })
+                    continue
+                claimed.append((idx, filename, content))
+        return job_id, json.loads(options), jd_text, json.loads(main_parsed), claimed
+
+    def _finish_file(self, job_id: str, idx: int, status: str, result: dict):
+        self._db.execute("UPDATE job_files SET status = ?, result = ?, content = NULL WHERE job_id = ? AND idx = ?",
+                         (status, json.dumps(result), job_id, idx))
+
+    def complete_files(self, job_id: str, results: List[Tuple[int, dict]]):
+        with self._lock, self._db:
+            for idx, result in results:
+                self._finish_file(job_id, idx, "error" if "error" in result else "done", result)
+            self._db.execute("UPDATE jobs SET updated = ? WHERE id = ?", (time.time(), job_id))
+
+    # Put claimed files back in the queue after an unexpected failure
+    def release_files(self, job_id: str, idxs: List[int]):
+        with self._lock, self._db:
+            self._db.executemany("UPDATE job_files SET status = 'pending', owner = NULL WHERE job_id = ? AND idx = ? AND status = 'running' AND owner = ?",
+                                 [(job_id, idx, self.owner) for idx in idxs])
+
+    # Mark the job done once no file is left; returns its session ID and final results. `finalize`
+    # gets the combined results first and what it returns is stored, e.g. with the shortlist applied.
+    def finish_if_done(self, job_id: str, finalize: Optional[Callable[[List[dict]], List[dict]]] = None) -> Optional[Tuple[str, List[dict]]]:
+        session_id = uuid.uuid4().hex
+        with self._lock, self._db:
+            left = self._db.execute(
+                "SELECT COUNT(*) FROM job_files WHERE job_id = ? AND status IN ('pending', 'running')", (job_id,)
+            ).fetchone()[0]
+            if left:
+                return None
+            updated = self._db.execute("UPDATE jobs SET status = 'done', session_id = ?, updated = ? WHERE id = ? AND status = 'running'",
+                                       (session_id, time.time(), job_id)).rowcount
+            if not updated:
+                return None
+            rows = self._db.execute("SELECT idx, result FROM job_files WHERE job_id = ? ORDER BY idx", (job_id,)).fetchall()
+            results = [json.loads(result) for _, result in rows]
+            if finalize is not None:
+                results = finalize(results)
+                self._db.executemany("UPDATE job_files SET result = ? WHERE job_id = ? AND idx = ?",
+                                     [(json.dumps(result), job_id, idx) for (idx, _), result in zip(rows, results)])
+        return session_id, results
+
+    # Finished job results behind a session ID, for sessions that expired or were lost with a restart
+    def session_data(self, session_id: str) -> Optional[Tuple[str, dict, List[dict]]]:
+        with self._lock:
+            job = self._db.execute(
+                "SELECT id, jd_text, main_parsed FROM jobs WHERE session_id = ? AND status = 'done'", (session_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            rows = self._db.execute("SELECT result FROM job_files WHERE job_id = ? ORDER BY idx", (job[0],)).fetchall()
+        return job[1], json.loads(job[2]), [json.loads(result) for result, in rows if result]
+
+
+class JobRunner:
+    # Local asyncio workers pulling JD parses and resume chunks off the job store
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, chunk_size: int = JOB_CHUNK_SIZE):
+        self.store = store
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # Wake idle workers after a new job was queued
+    def notify(self):
+        self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            if not await self._step():
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    # Renew our leases well before they can expire
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(JOB_LEASE_TIMEOUT / 4)
+            self.store.heartbeat()
+
+    # Do one unit of work; False when the queue is empty
+    async def _step(self) -> bool:
+        claimed = self.store.claim_jd()
+        if claimed is not None:
+            job_id, jd_text, options = claimed
+            try:
+                main_parsed = await parse_text(jd_text, options.get("parse_mode"))
+            except Exception as e:
+                self.store.fail(job_id, f"Main JD parsing failed: {str(e)}")
+                return True
+            self.store.set_parsed(job_id, main_parsed)
+            self._wakeup.set()
+            return True
+
+        claimed = self.store.claim_files(self.chunk_size)
+        if claimed is None:
+            return False
+        job_id, options, jd_text, main_parsed, files = claimed
+        idxs = [idx for idx, _, _ in files]
+        try:
+            uploads = [UploadFile(BytesIO(content), filename=filename) for _, filename, content in files]
+            # The shortlist cutoffs apply to the whole job, so they wait for the last chunk
+            results = await process_resumes(uploads, main_parsed, batch_size=options.get("batch_size"),
+                                            parse_mode=options.get("parse_mode")) if uploads else []
+            self.store.complete_files(job_id, list(zip(idxs, results)))
+        except asyncio.CancelledError:
+            self.store.release_files(job_id, idxs)
+            raise
+        except Exception:
+            # Unexpected failure: the chunk goes back to the queue and counts as an attempt
+            self.store.release_files(job_id, idxs)
+            return True
+
+        final = self.store.finish_if_done(job_id, shortlister(options, main_parsed))
+        if final is not None:
+            # Completed jobs can feed /generate-emails/ like a regular comparison
+            session_id, results = final
+            create_session(jd_text, main_parsed, results, session_id)
+        return True
+
+
+_store: Optional[JobStore] = None
+_runner: Optional[JobRunner] = None
+
+# Shared job store, opened on first use
+def get_job_store() -> JobStore:
+    global _store
+    if _store is None:
+        _store = JobStore(JOBS_DB)
+    return _store
+
+def start_job_workers():
+    global _runner
+    if _runner is None:
+        _runner = JobRunner(get_job_store())
+        _runner.start()
+
+async def stop_job_workers():
+    global _runner
+    if _runner is not None:
+        await _runner.stop()
+        _runner = None
+
+# A comparison session, rebuilt from the stored job results when the in-memory one is gone
+def load_session(session_id: str) -> Optional[dict]:
+    session = get_session(session_id)
+    if session is not None:
+        return session
+    data = get_job_store().session_data(session_id)
+    if data is None:
+        return None
+    create_session(*data, session_id)
+    return get_session(session_id)
+
+# Queue a comparison of uploaded resumes against a JD; returns the job ID. The uploads are written
+# to SQLite off the event loop.
+async def submit_job(jd_text: str, files: List[Tuple[str, bytes]], options: Dict[str, Any]) -> str:
+    job_id = await run_in_threadpool(lambda: get_job_store().create(jd_text, files, options))
+    if _runner is not None:
+        _runner.notify()
+    return job_id
@@ -0,0 +1,92 @@
+import re
+from typing import List, Optional
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20
+}
+_NUM = r"\b(\d{1,2}(?:\.\d)?|" + "|".join(NUMBER_WORDS) + r")\b"
+
+# Experience phrases like "5+ years", "3-5 years of experience", "2 to 4 yrs"
+EXPERIENCE_RE = re.compile(
+    r"\b\d{1,2}(?:\.\d)?\s*(?:\+|plus)?\s*(?:(?:-|–|to)\s*\d{1,2}\s*\+?\s*)?(?:years?|yrs?)(?![a-z])(?:\s+of\s+experience)?",
+    re.IGNORECASE
+)
+
+# Pieces of an experience string; the earliest one wins, and at the same position the first listed
+ENTRY_LEVEL_RE = re.compile(r"\b(?:fresher|freshers|entry[- ]level|no experience)\b")
+RANGE_RE = re.compile(_NUM + r"\s*\+?\s*(?:-|–|to)\s*" + _NUM)
+OPEN_ENDED_RE = re.compile(_NUM + r"\s*(?:\+|plus\b|(?:years?|yrs?)?\s*(?:or more|and above))")
+MINIMUM_RE = re.compile(r"\b(?:at least|minimum(?: of)?|min\.?|over|more than)\s*" + _NUM)
+NUMBER_RE = re.compile(_NUM)
+MONTHS_RE = re.compile(r"\bmonths?\b")
+YEARS_RE = re.compile(r"\b(?:years?|yrs?)\b")
+
+# Degree phrases by level, highest first
+DEGREE_PATTERNS = [
+    (5, re.compile(r"\b(?:ph\.?\s?d|doctorate|doctoral degree)(?![a-z])", re.IGNORECASE)),
+    (4, re.compile(r"\b(?:master'?s?(?:\s+degree)?|mba|m\.?tech|mca|m\.s\.|msc|m\.sc)(?![a-z])", re.IGNORECASE)),
+    (3, re.compile(r"\b(?:bachelor'?s?(?:\s+degree)?|b\.?tech|b\.e\.|bca|b\.s\.|bsc|b\.sc|undergraduate degree)(?![a-z])", re.IGNORECASE)),
+    (2, re.compile(r"\b(?:associate'?s?\s+degree|diploma)(?![a-z])", re.IGNORECASE)),
+    (1, re.compile(r"\b(?:high school|secondary school|ged)(?![a-z])", re.IGNORECASE)),
+]
+
+
+def _number(value: str) -> float:
+    return float(NUMBER_WORDS.get(value, value))
+
+# Turn an experience string into [min_years, max_years]; max is None when open-ended
+def experience_range(text) -> Optional[List[Optional[float]]]:
+    if not text or not isinstance(text, str):
+        return None
+    text = text.lower()
+    if ENTRY_LEVEL_RE.search(text):
+        return [0.0, 0.0]
+
+    scale = 1 / 12 if MONTHS_RE.search(text) and not YEARS_RE.search(text) else 1
+    # "5 years in Python, 3-4 years in Java" is about the first phrase, not the first range anywhere
+    matches = [(match.start(), kind, match) for kind, pattern in enumerate((RANGE_RE, OPEN_ENDED_RE, MINIMUM_RE, NUMBER_RE))
+               if (match := pattern.search(text))]
+    if not matches:
+        return None
+    _, kind, match = min(matches, key=lambda item: item[:2])
+    if kind == 0:
+        low, high = sorted((_number(match.group(1)), _number(match.group(2))))
+        return [low * scale, high * scale]
+    if kind in (1, 2):
+        return [_number(match.group(1)) * scale, None]
+    years = _number(match.group(1)) * scale
+    return [years, years]
+
+# Degree level of an education string: 1 high school ... 5 doctorate. A candidate's education
+# counts by the highest degree it names; a requirement like "Bachelor's or Master's" is met by
+# the lowest one, so `lowest` gives that instead.
+def education_level(text, lowest: bool = False) -> Optional[int]:
+    if not text or not isinstance(text, str):
+        return None
+    for level, pattern in (reversed(DEGREE_PATTERNS) if lowest else DEGREE_PATTERNS):
+        if pattern.search(text):
+            return level
+    return None
+
+# Store the normalized experience range and education level on a parsed document
+def normalize_parsed(parsed: dict) -> dict:
+    parsed["experience_years"] = experience_range(parsed.get("experience"))
+    parsed["education_level"] = education_level(parsed.get("education"))
+    parsed["education_min_level"] = education_level(parsed.get("education"), lowest=True)
+    return parsed
+
+# Normalized fields of a parsed document, computed once if it predates normalization
+def normalized(parsed: dict, field: str):
+    if field not in parsed:
+        normalize_parsed(parsed)
+    return parsed[field]
+
+# Years of experience a candidate brings: the top of their range
+def candidate_years(years: List[Optional[float]]) -> float:
+    return years[1] if years[1] is not None else years[0]
+
+# Whether a candidate has the years a JD asks for. The JD's lower bound is the requirement;
+# experience beyond its upper bound is not held against anyone.
+def meets_experience(required: List[Optional[float]], found: List[Optional[float]]) -> bool:
+    return candidate_years(found) >= required[0]
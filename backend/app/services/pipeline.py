@@ -0,0 +1,228 @@
+import asyncio, heapq
+from typing import Iterable, List, Optional, Set, Tuple, Union
+from fastapi import UploadFile
+from app.utils.config import PIPELINE_CONCURRENCY, PARSE_BATCH_SIZE, PARSE_MODE, FAST_PARSE_MIN_CONFIDENCE
+from app.services.file_processing import extract_text_from_bytes, read_upload
+from app.services.generate_jd import parse_jd_with_gemini, parse_batch_with_gemini, pack_batches
+from app.services.fast_parser import fast_parse
+from app.services.calculate_match_score import calculate_match_score, calculate_match_scores
+from app.services.generate_remarks import analyze_gap
+from app.services.candidate_store import get_candidate_store
+from app.services.dedup import find_duplicates, get_seen_index
+from app.utils.cache import make_key
+from app.utils.metrics import timed
+
+# Extract text from an uploaded file
+async def extract_upload(file: UploadFile) -> str:
+    content = await read_upload(file)
+    text = await extract_text_from_bytes(content, file.filename)
+    if not text:
+        raise ValueError("Empty content")
+    return text
+
+# Parse locally when the mode allows it; None means the text still needs Gemini
+def try_fast_parse(text: str, parse_mode: str) -> Optional[dict]:
+    if parse_mode == "llm":
+        return None
+    parsed, confidence = fast_parse(text)
+    if parse_mode == "fast" or confidence >= FAST_PARSE_MIN_CONFIDENCE:
+        return parsed
+    return None
+
+# Parse a document with the given parse mode; resumes go through the bulk LLM lane
+async def parse_text(text: str, parse_mode: Optional[str] = None, lane: str = "default") -> dict:
+    with timed("parse"):
+        parsed = try_fast_parse(text, parse_mode or PARSE_MODE)
+        if parsed is not None:
+            return parsed
+        return await parse_jd_with_gemini(text, lane)
+
+# Indices of the best `top_k` scores at or above `min_score`, picked with a bounded heap
+def select_shortlist(scores: Iterable[Tuple[int, float]], top_k: Optional[int] = None, min_score: Optional[float] = None) -> Set[int]:
+    if min_score is not None:
+        scores = ((i, score) for i, score in scores if score >= min_score)
+    if top_k is None:
+        return {i for i, _ in scores}
+    return {i for i, _ in heapq.nlargest(top_k, scores, key=lambda item: item[1])}
+
+# Positions of results that are near-duplicates of another file in the same list. They are the same
+# candidate, so they take no shortlist place and get no email of their own.
+def batch_duplicates(results: List[dict]) -> Set[int]:
+    originals = {result["filename"] for result in results if not result.get("duplicate_of")}
+    return {i for i, result in enumerate(results) if result.get("duplicate_of") in originals}
+
+# Attach the gap analysis to a scored result
+def attach_gap(result: dict, main_parsed: dict) -> dict:
+    gap = analyze_gap(main_parsed, result["parsed"])
+    result["missing_skills"] = gap["missing_skills"]
+    result["remarks"] = gap["remarks"]
+    return result
+
+# Score parsed resumes against the main JD in one batch; only the shortlist gets the gap analysis.
+# Files named in `duplicate_of` are copies and stay off the shortlist.
+def score_resumes(
+    filenames: List[str],
+    parsed_list: List[Union[dict, Exception]],
+    main_parsed: dict,
+    top_k: Optional[int] = None,
+    min_score: Optional[float] = None,
+    duplicate_of: Optional[List[Optional[str]]] = None
+) -> List[dict]:
+    results = [{"filename": filename, "error": str(parsed)} if isinstance(parsed, Exception) else None
+               for filename, parsed in zip(filenames, parsed_list)]
+    valid = [i for i, result in enumerate(results) if result is None]
+
+    try:
+        with timed("score"):
+            scores = calculate_match_scores(main_parsed, [parsed_list[i] for i in valid])
+    except Exception:
+        # Fall back to per-pair scoring so one malformed document only fails itself
+        scores = [None] * len(valid)
+
+    for i, score in zip(valid, scores):
+        try:
+            if score is None:
+                score = calculate_match_score(main_parsed, parsed_list[i])
+            results[i] = {"filename": filenames[i], "parsed": parsed_list[i], "score": score}
+        except Exception as e:
+            results[i] = {"filename": filenames[i], "error": str(e)}
+
+    for result, duplicate in zip(results, duplicate_of or []):
+        if duplicate is not None:
+            result["duplicate_of"] = duplicate
+    return apply_shortlist(results, main_parsed, top_k, min_score)
+
+# Mark the shortlist of scored results in place; only shortlisted ones keep the gap analysis.
+# Also used to cut the combined results of a background job, scored chunk by chunk.
+def apply_shortlist(results: List[dict], main_parsed: dict, top_k: Optional[int] = None, min_score: Optional[float] = None) -> List[dict]:
+    duplicates = batch_duplicates(results)
+
+    shortlist = select_shortlist(((i, result["score"]) for i, result in enumerate(results)
+                                  if "score" in result and i not in duplicates), top_k, min_score)
+    with timed("gap"):
+        for i, result in enumerate(results):
+            if "score" not in result:
+                continue
+            result["shortlisted"] = i in shortlist
+            if i in duplicates:
+                result.update({"missing_skills": [], "remarks": [f"Near-duplicate of {result['duplicate_of']}."]})
+                continue
+            if not result["shortlisted"]:
+                result.update({"missing_skills": [], "remarks": ["Below the shortlist cutoff."]})
+                continue
+            try:
+                attach_gap(result, main_parsed)
+            except Exception as e:
+                results[i] = {"filename": result["filename"], "error": str(e)}
+    return results
+
+# Remember successfully parsed resumes in the candidate store for later searches
+def save_candidates(filenames: List[str], texts: List[Optional[str]], parsed_list: List[Union[dict, Exception]]):
+    store = get_candidate_store()
+    if store is None:
+        return
+    store.add_many([
+        (make_key(text), filename, parsed)
+        for filename, text, parsed in zip(filenames, texts, parsed_list)
+        if text is not None and isinstance(parsed, dict)
+    ])
+
+# Process resumes with a bounded fan-out: extract, drop near-duplicates, parse, then score them together;
+# results keep the input order
+async def process_resumes(
+    files: List[UploadFile],
+    main_parsed: dict,
+    concurrency: int = PIPELINE_CONCURRENCY,
+    batch_size: Optional[int] = None,
+    parse_mode: Optional[str] = None,
+    top_k: Optional[int] = None,
+    min_score: Optional[float] = None
+) -> List[dict]:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    batch_size = batch_size or PARSE_BATCH_SIZE
+    parse_mode = parse_mode or PARSE_MODE
+    filenames = [file.filename for file in files]
+    parsed_list: List[Union[dict, Exception, None]] = [None] * len(files)
+
+    async def extract(index: int, file: UploadFile) -> Optional[str]:
+        async with semaphore:
+            try:
+                return await extract_upload(file)
+            except Exception as e:
+                # Keep per-file errors isolated from the rest of the batch
+                parsed_list[index] = e
+                return None
+
+    texts = list(await asyncio.gather(*(extract(i, file) for i, file in enumerate(files))))
+
+    # Near-duplicates reuse the parsed result of their representative instead of being parsed again
+    seen = get_seen_index(parse_mode)
+    with timed("dedup"):
+        signatures, representatives, seen_matches = find_duplicates(texts, seen)
+    duplicate_of: List[Optional[str]] = [None] * len(files)
+    for i, match in seen_matches.items():
+        parsed_list[i] = match["parsed"]
+        duplicate_of[i] = match["filename"]
+
+    pending = [i for i, text in enumerate(texts)
+               if text is not None and i not in representatives and i not in seen_matches]
+    if batch_size > 1:
+        await parse_batched(texts, pending, parsed_list, semaphore, batch_size, parse_mode)
+    else:
+        await parse_each(texts, pending, parsed_list, semaphore, parse_mode)
+
+    for i, representative in representatives.items():
+        parsed_list[i] = parsed_list[representative]
+        duplicate_of[i] = filenames[representative]
+    if seen is not None:
+        for i in pending:
+            if isinstance(parsed_list[i], dict):
+                seen.add(make_key(texts[i]), signatures[i], {"filename": filenames[i], "parsed": parsed_list[i]})
+
+    # Duplicates are the same candidate, so only representatives go into the store
+    with timed("store"):
+        save_candidates(filenames, [None if duplicate else text for text, duplicate in zip(texts, duplicate_of)], parsed_list)
+    return score_resumes(filenames, parsed_list, main_parsed, top_k, min_score, duplicate_of)
+
+# Parse each pending text on its own
+async def parse_each(
+    texts: List[Optional[str]],
+    pending: List[int],
+    parsed_list: List[Union[dict, Exception, None]],
+    semaphore: asyncio.Semaphore,
+    parse_mode: str
+):
+    async def parse(i: int):
+        async with semaphore:
+            try:
+                parsed_list[i] = await parse_text(texts[i], parse_mode, "bulk")
+            except Exception as e:
+                parsed_list[i] = e
+
+    await asyncio.gather(*(parse(i) for i in pending))
+
+# Parse pending texts in packed multi-document Gemini calls
+async def parse_batched(
+    texts: List[Optional[str]],
+    pending: List[int],
+    parsed_list: List[Union[dict, Exception, None]],
+    semaphore: asyncio.Semaphore,
+    batch_size: int,
+    parse_mode: str
+):
+    # Documents the local parser handles never reach Gemini
+    remote = []
+    for i in pending:
+        parsed_list[i] = try_fast_parse(texts[i], parse_mode)
+        if parsed_list[i] is None:
+            remote.append(i)
+
+    async def parse(batch: List[int]):
+        async with semaphore:
+            indexes = [remote[j] for j in batch]
+            with timed("parse"):
+                batch_results = await parse_batch_with_gemini([texts[i] for i in indexes])
+            for i, parsed in zip(indexes, batch_results):
+                parsed_list[i] = parsed
+
+    await asyncio.gather(*(parse(batch) for batch in pack_batches([texts[i] for i in remote], batch_size)))
@@ -1,5 +1,12 @@
 # prompts.py
 
+# Bump whenever a prompt template changes so cached responses are invalidated
+PROMPT_VERSION = "2"
+
+# Drop the template's indentation and blank lines; they cost tokens on every parsing call
+def flush_left(prompt: str) -> str:
+    return "\n".join(line.strip() for line in prompt.splitlines() if line.strip())
+
 def get_jd_generation_prompt(job_title, experience, skills, company, employment_type, industry, location):
     return f"""
     Write a professional job description using the following details:
@@ -110,8 +117,49 @@ def generate_interview_email_prompt(candidate_name, job_title, company_name, mat
     [email body]
     """
 
-def parse_jd_with_gemini_prompt(text: str) -> str:
+def personalized_line_prompt(candidate_name, job_title, company_name, candidate_skills, is_best_match):
+    outcome = "is being invited to an interview" if is_best_match else "was not selected this time"
     return f"""
+    Write ONE warm, specific sentence for a recruiting email to {candidate_name}, who applied for
+    {job_title} at {company_name} and {outcome}.
+
+    **Context:**
+    - Candidate Skills: {candidate_skills}
+
+    **Requirements:**
+    1. Mention something positive about their skills
+    2. At most 30 words
+    3. No greeting, subject line, sign-off or placeholders
+    4. Don't mention match scores or reasons for the decision
+
+    Return only the sentence.
+    """
+
+# Response schemas for parsing calls (the OpenAPI subset Gemini's responseSchema accepts)
+PARSED_DOCUMENT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "experience": {"type": "STRING"},
+        "education": {"type": "STRING"},
+        "skills": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "job_title": {"type": "STRING"},
+        "company_name": {"type": "STRING"}
+    },
+    "required": ["skills"],
+    "propertyOrdering": ["experience", "education", "skills", "job_title", "company_name"]
+}
+PARSED_BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"index": {"type": "INTEGER"}, "parsed": PARSED_DOCUMENT_SCHEMA},
+        "required": ["index", "parsed"],
+        "propertyOrdering": ["index", "parsed"]
+    }
+}
+
+def parse_jd_with_gemini_prompt(text: str) -> str:
+    return flush_left(f"""
     Analyze this job description and return JSON with ONLY explicitly mentioned keywords:
 
     {{
@@ -139,4 +187,43 @@ def parse_jd_with_gemini_prompt(text: str) -> str:
     5. For experience:
     - Only include exact phrases like "5+ years"
     - Don't interpret ranges
-    """
+    """)
+
+def parse_batch_with_gemini_prompt(texts) -> str:
+    documents = "\n\n".join(f"### Document {index}:\n{text}" for index, text in enumerate(texts))
+    return flush_left(f"""
+    Analyze each of the {len(texts)} documents below and return a JSON array with one entry per document,
+    using ONLY explicitly mentioned keywords:
+
+    [
+        {{
+            "index": document number,
+            "parsed": {{
+                "experience": "X+ years",
+                "education": "highest degree required",
+                "skills": [list of skills like languages, frameworks, cloud, databases],
+                "job_title": "extracted job title",
+                "company_name": "company name if mentioned"
+            }}
+        }}
+    ]
+
+    {documents}
+
+    ### STRICT RULES:
+    1. Return exactly one array entry per document, with "index" matching its document number
+    2. Analyze each document independently; never mix information between documents
+    3. Extract ONLY exact words/phrases that appear in the text
+    4. NEVER add:
+    - Explanations
+    - Placeholder text (e.g., "Nice to have", "Preferred")
+    - Implied requirements
+    - Any text not verbatim from the document
+    5. If a field has no explicit mention in the text, omit it entirely
+    6. For skills:
+    - Only include specific technologies/tools (e.g., "Python", "AWS")
+    - Exclude generic terms (e.g., "teamwork", "communication")
+    7. For experience:
+    - Only include exact phrases like "5+ years"
+    - Don't interpret ranges
+    """)
@@ -0,0 +1,34 @@
+import threading, time, uuid
+from collections import OrderedDict
+from typing import List, Optional
+from app.utils.config import SESSION_TTL, SESSION_MAX
+
+_sessions = OrderedDict()
+_lock = threading.Lock()
+
+# Keep the parsed JD and processed candidates of a comparison for later reuse
+def create_session(jd_text: str, main_parsed: dict, results: List[dict], session_id: Optional[str] = None) -> str:
+    session_id = session_id or uuid.uuid4().hex
+    with _lock:
+        _sessions[session_id] = {
+            "jd_text": jd_text,
+            "main_parsed": main_parsed,
+            "results": results,
+            "created": time.time()
+        }
+        _sessions.move_to_end(session_id)
+        # Drop the oldest sessions once we are over capacity
+        while len(_sessions) > SESSION_MAX:
+            _sessions.popitem(last=False)
+    return session_id
+
+# Fetch a live session, or None if unknown or expired
+def get_session(session_id: str) -> Optional[dict]:
+    with _lock:
+        session = _sessions.get(session_id)
+        if session is None:
+            return None
+        if time.time() - session["created"] > SESSION_TTL:
+            del _sessions[session_id]
+            return None
+        return session
@@ -0,0 +1,174 @@
+import hashlib, os, sqlite3, threading, time
+from collections import OrderedDict
+from typing import Optional
+from app.utils.metrics import register_collector
+
+
+# Build a stable cache key from any number of string parts
+def make_key(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+# UTF-8 size of a cached value; ASCII strings (the common case) are measured without encoding
+def value_bytes(value: str) -> int:
+    return len(value) if value.isascii() else len(value.encode("utf-8"))
+
+
+class MemoryTier:
+    # LRU tier bounded by the total UTF-8 size of cached values
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (self.ttl and time.time() - item[1] > self.ttl):
+                if item is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: str):
+        size = value_bytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            self._items[key] = (value, time.time(), size)
+            self.size += size
+            # Evict least recently used entries until we fit again
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._items))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+
+    def _remove(self, key: str):
+        _, _, size = self._items.pop(key)
+        self.size -= size
+
+    def stats(self) -> dict:
+        return {"entries": len(self._items), "bytes": self.size, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+class DiskTier:
+    # SQLite tier that survives restarts, optionally capped at max_entries rows
+    def __init__(self, path: str, ttl: float, max_entries: int = 0):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+        self.prune()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set(self, key: str, value: str):
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO cache (key, value, created) VALUES (?, ?, ?)", (key, value, time.time()))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self.prune()
+
+    def delete(self, key: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    # Drop expired rows, then the oldest rows beyond max_entries
+    def prune(self):
+        with self._lock, self._db:
+            if self.ttl:
+                self._db.execute("DELETE FROM cache WHERE created < ?", (time.time() - self.ttl,))
+            if self.max_entries:
+                self._db.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache:
+    # In-memory LRU in front of an optional on-disk tier
+    def __init__(self, max_bytes: int, memory_ttl: float, disk_path: Optional[str] = None, disk_ttl: float = 0, disk_max_entries: int = 0):
+        self.memory = MemoryTier(max_bytes, memory_ttl)
+        self.disk = DiskTier(disk_path, disk_ttl, disk_max_entries) if disk_path else None
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+
+        value = self.disk.get(key)
+        if value is not None:
+            # Promote disk hits into memory
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def stats(self) -> dict:
+        return {"memory": self.memory.stats(), "disk": self.disk.stats() if self.disk else None}
+
+
+# Expose a cache's hit/miss counters on /metrics, read at scrape time
+def register_cache_metrics(name: str, cache: Optional[TieredCache]):
+    if cache is None:
+        return
+
+    def collect():
+        stats = cache.stats()
+        tiers = [("memory", stats["memory"])] + ([("disk", stats["disk"])] if stats["disk"] else [])
+        return [
+            ("cache_requests_total", "counter", "Cache lookups by result",
+             [({"cache": name, "tier": tier, "result": result}, tier_stats[key])
+              for tier, tier_stats in tiers for result, key in (("hit", "hits"), ("miss", "misses"))]),
+            ("cache_entries", "gauge", "Entries held by a cache tier",
+             [({"cache": name, "tier": tier}, tier_stats["entries"]) for tier, tier_stats in tiers])
+        ]
+
+    register_collector(collect)
@@ -1,12 +1,96 @@
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Configure Gemini API key
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini = genai.GenerativeModel(os.getenv("GEMINI_MODEL"))
+# Model backend: "gemini" (REST API) or "stub" (deterministic local replies, no key needed)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
 
-# Create directory for uploaded JDs
-UPLOAD_DIR = "uploaded_jds"
\ No newline at end of file
+# Gemini API settings
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+
+# Default per-call timeout (seconds) and connection pool size for LLM calls
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+
+# Prompt -> response cache: in-memory LRU (size in bytes, TTL in seconds) plus an optional SQLite tier
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "cache/llm_cache.sqlite3")
+LLM_CACHE_DISK_TTL = float(os.getenv("LLM_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+
+# Extracted-text cache keyed by SHA-256 of the uploaded bytes
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+EXTRACTION_CACHE_TTL = float(os.getenv("EXTRACTION_CACHE_TTL", "86400"))
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", "")
+EXTRACTION_CACHE_DISK_TTL = float(os.getenv("EXTRACTION_CACHE_DISK_TTL", str(30 * 24 * 3600)))
+EXTRACTION_CACHE_DISK_MAX_ENTRIES = int(os.getenv("EXTRACTION_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# Extraction process pool: worker count (0 runs extraction in a thread) and per-document timeout
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "60"))
+
+# Uploads are read in chunks and rejected above MAX_UPLOAD_BYTES
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Max number of resumes processed concurrently per request
+PIPELINE_CONCURRENCY = int(os.getenv("PIPELINE_CONCURRENCY", "8"))
+
+# Resumes packed into one Gemini parsing call (1 disables batching) and the token budget per batch
+PARSE_BATCH_SIZE = int(os.getenv("PARSE_BATCH_SIZE", "1"))
+PARSE_BATCH_TOKENS = int(os.getenv("PARSE_BATCH_TOKENS", "24000"))
+
+# Parse mode: "llm" (Gemini), "fast" (local rules) or "hybrid" (local rules, Gemini when confidence is low)
+PARSE_MODE = os.getenv("PARSE_MODE", "llm")
+PARSE_MODES = ("fast", "llm", "hybrid")
+FAST_PARSE_MIN_CONFIDENCE = float(os.getenv("FAST_PARSE_MIN_CONFIDENCE", "0.6"))
+
+# Ask the model for schema-constrained JSON when parsing, and how often to re-ask when the
+# reply can't be recovered even by the tolerant JSON parser
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() == "true"
+PARSE_RETRIES = int(os.getenv("PARSE_RETRIES", "1"))
+
+# Parsing prompts: compact documents (whitespace, repeated headers/footers, irrelevant sections)
+# and cap each at this many estimated tokens (0 = no cap)
+PROMPT_COMPACTION_ENABLED = os.getenv("PROMPT_COMPACTION_ENABLED", "true").lower() == "true"
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "3000"))
+
+# Comparison sessions reused by /generate-emails/ (TTL in seconds)
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "256"))
+
+# Persistent store of parsed candidates searched by /search-candidates
+CANDIDATE_STORE_ENABLED = os.getenv("CANDIDATE_STORE_ENABLED", "true").lower() == "true"
+CANDIDATE_STORE_DB = os.getenv("CANDIDATE_STORE_DB", "storage/candidates.sqlite3")
+
+# Near-duplicate resumes (MinHash/LSH) reuse the parse of their representative
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_MAX_DOCS = int(os.getenv("DEDUP_MAX_DOCS", "10000"))
+
+# Durable background jobs for large comparisons (/compare-jd-and-files/ with background=true)
+JOBS_DB = os.getenv("JOBS_DB", "storage/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_CHUNK_SIZE = int(os.getenv("JOB_CHUNK_SIZE", "16"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "604800"))
+# Seconds without a heartbeat before another worker takes over a claimed JD or file
+JOB_LEASE_TIMEOUT = float(os.getenv("JOB_LEASE_TIMEOUT", "120"))
+
+# Emails: "template" (local only), "personalized" (template plus one Gemini sentence) or "llm" (whole email from Gemini)
+EMAIL_MODES = ("template", "personalized", "llm")
+EMAIL_MODE = os.getenv("EMAIL_MODE", "personalized")
+EMAIL_CONCURRENCY = int(os.getenv("EMAIL_CONCURRENCY", "8"))
+
+# Outbound Gemini scheduling: request/token budgets per minute (0 = unlimited) and retries
+LLM_RPM = float(os.getenv("LLM_RPM", "300"))
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
@@ -0,0 +1,99 @@
+import httpx, json
+from typing import Optional, Tuple
+from app.utils.config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_API_BASE, LLM_TIMEOUT, LLM_MAX_CONNECTIONS
+from app.utils.llm_providers import LLMError, LLMProvider, TextStream
+from app.utils.metrics import LLM_ERRORS
+
+
+# Turn a non-200 Gemini response into an LLMError, keeping what we need to decide on a retry
+def api_error(response: httpx.Response) -> LLMError:
+    retry_after = response.headers.get("retry-after")
+    try:
+        retry_after = float(retry_after) if retry_after else None
+    except ValueError:
+        retry_after = None
+    LLM_ERRORS.inc(str(response.status_code))
+    return LLMError(f"Gemini API error {response.status_code}: {response.text}", response.status_code, retry_after)
+
+# Build a generateContent request body for a single-turn prompt, optionally constrained to JSON
+def build_request(prompt: str, response_schema: Optional[dict] = None) -> dict:
+    body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    if response_schema:
+        body["generationConfig"] = {"responseMimeType": "application/json", "responseSchema": response_schema}
+    return body
+
+# Pull the generated text out of a generateContent response
+def response_text(data: dict) -> str:
+    candidates = data.get("candidates") or []
+    if not candidates:
+        raise LLMError(f"Empty model response: {data.get('promptFeedback', {})}")
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+# Text of one streamed chunk; chunks without candidates only carry metadata
+def chunk_text(data: dict) -> str:
+    if not data.get("candidates"):
+        block_reason = data.get("promptFeedback", {}).get("blockReason")
+        if block_reason:
+            raise LLMError(f"Prompt blocked: {block_reason}")
+        return ""
+    return response_text(data)
+
+
+class GeminiProvider(LLMProvider):
+    # Gemini REST API over one pooled async HTTP client
+    transient_errors = (httpx.TransportError, httpx.TimeoutException)
+
+    def __init__(self, model: Optional[str] = GEMINI_MODEL, client: Optional[httpx.AsyncClient] = None):
+        if not model:
+            raise LLMError("GEMINI_MODEL is not set; set it or choose another LLM_PROVIDER")
+        # The SDK accepts both "gemini-x" and "models/gemini-x"; the REST path needs the bare name
+        self.model = model.removeprefix("models/")
+        self._client = client
+
+    # Shared async HTTP client so every call reuses pooled connections
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=GEMINI_API_BASE,
+                headers={"x-goog-api-key": GEMINI_API_KEY or ""},
+                timeout=LLM_TIMEOUT,
+                limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
+            )
+        return self._client
+
+    async def generate(self, prompt: str, timeout: float, response_schema: Optional[dict] = None) -> Tuple[str, Optional[int]]:
+        response = await self.client.post(f"/models/{self.model}:generateContent", json=build_request(prompt, response_schema), timeout=timeout)
+        if response.status_code != 200:
+            raise api_error(response)
+        data = response.json()
+        return response_text(data), data.get("usageMetadata", {}).get("totalTokenCount")
+
+    async def open_stream(self, prompt: str, timeout: float) -> TextStream:
+        request = self.client.build_request(
+            "POST",
+            f"/models/{self.model}:streamGenerateContent",
+            params={"alt": "sse"},
+            json=build_request(prompt),
+            timeout=timeout,
+        )
+        response = await self.client.send(request, stream=True)
+        if response.status_code != 200:
+            await response.aread()
+            await response.aclose()
+            raise api_error(response)
+
+        async def chunks():
+            # Server-Sent Events: one JSON chunk per "data:" line
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    data = json.loads(line[5:])
+                    yield chunk_text(data), data.get("usageMetadata", {}).get("totalTokenCount")
+
+        return TextStream(chunks(), response.aclose)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,141 @@
+import asyncio
+from typing import AsyncIterator, Optional
+from app.utils.config import *
+from app.utils.cache import TieredCache, make_key, register_cache_metrics
+from app.utils.metrics import register_collector, timed, LLM_PROMPT_CHARS, LLM_RESPONSE_CHARS
+from app.services.prompts import PROMPT_VERSION
+from app.utils.llm_scheduler import scheduler, estimate_tokens
+from app.utils.llm_providers import LLMError, get_provider, close_provider
+from app.utils.singleflight import SingleFlight
+
+# Cache of rendered prompt -> model response, opened on first use so importing the app touches no files
+_response_cache: Optional[TieredCache] = None
+_response_cache_opened = False
+
+# Model calls currently in flight, keyed like the response cache
+in_flight = SingleFlight()
+
+register_collector(lambda: [
+    ("llm_single_flight_total", "counter", "Model calls started vs. coalesced onto one in flight",
+     [({"result": "called"}, in_flight.calls), ({"result": "coalesced"}, in_flight.coalesced)])
+])
+
+
+# The response cache, or None when disabled
+def get_response_cache() -> Optional[TieredCache]:
+    global _response_cache, _response_cache_opened
+    if not _response_cache_opened:
+        _response_cache_opened = True
+        if LLM_CACHE_ENABLED:
+            _response_cache = TieredCache(LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL, LLM_CACHE_DB or None, LLM_CACHE_DISK_TTL)
+            register_cache_metrics("llm", _response_cache)
+    return _response_cache
+
+# Swap in a response cache, or None to disable caching, e.g. in benchmarks
+def set_response_cache(cache: Optional[TieredCache]):
+    global _response_cache, _response_cache_opened
+    _response_cache, _response_cache_opened = cache, True
+
+# Release the provider's pooled connections on app shutdown
+async def close_client():
+    await close_provider()
+
+# Cache key for a prompt on the current model and prompt version; schema-constrained replies
+# are kept apart from free-form ones
+def cache_key(prompt: str, response_schema: Optional[dict] = None) -> str:
+    if response_schema:
+        return make_key(get_provider().model, PROMPT_VERSION, "json", prompt)
+    return make_key(get_provider().model, PROMPT_VERSION, prompt)
+
+# Generate content for a prompt without blocking the event loop; identical prompts already
+# in flight share one model call. With a response schema the model is asked for matching JSON.
+async def generate_content(prompt: str, timeout: Optional[float] = None, use_cache: bool = True, lane: str = "default",
+                           response_schema: Optional[dict] = None) -> str:
+    if not use_cache:
+        return await call_model(prompt, timeout, lane, response_schema)
+
+    key = cache_key(prompt, response_schema)
+    response_cache = get_response_cache()
+    if response_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    async def fetch() -> str:
+        text = await call_model(prompt, timeout, lane, response_schema)
+        if response_cache:
+            response_cache.set(key, text)
+        return text
+
+    return await in_flight.do(key, fetch)
+
+# Drop a cached response, e.g. when it turned out to be unusable
+def invalidate(prompt: str, response_schema: Optional[dict] = None):
+    response_cache = get_response_cache()
+    if response_cache:
+        response_cache.delete(cache_key(prompt, response_schema))
+
+# Run one model call through the scheduler, retrying rate limits, transient server errors and
+# network failures with jittered exponential backoff
+async def with_retries(prompt: str, lane: str, send):
+    estimated = estimate_tokens(prompt)
+    transient_errors = get_provider().transient_errors
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await scheduler.acquire(estimated, lane)
+        try:
+            return await send()
+        except LLMError as e:
+            if e.status_code == 429:
+                scheduler.throttled += 1
+            if not e.retryable or attempt == LLM_MAX_RETRIES:
+                raise
+            delay = scheduler.backoff(attempt, e.retry_after)
+        except transient_errors:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = scheduler.backoff(attempt)
+        await asyncio.sleep(delay)
+
+# Send a prompt to the configured provider
+async def call_model(prompt: str, timeout: Optional[float] = None, lane: str = "default", response_schema: Optional[dict] = None) -> str:
+    async def send() -> str:
+        with timed("llm"):
+            text, tokens = await get_provider().generate(prompt, timeout or LLM_TIMEOUT, response_schema)
+        scheduler.record_usage(estimate_tokens(prompt), tokens)
+        LLM_PROMPT_CHARS.observe(len(prompt), lane)
+        LLM_RESPONSE_CHARS.observe(len(text), lane)
+        return text
+
+    return await with_retries(prompt, lane, send)
+
+# Stream generated text for a prompt as the model produces it; the timeout applies between chunks
+async def stream_content(prompt: str, timeout: Optional[float] = None, use_cache: bool = True, lane: str = "interactive") -> AsyncIterator[str]:
+    response_cache = get_response_cache()
+    key = cache_key(prompt) if response_cache and use_cache else None
+    if key:
+        cached = response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    # Only opening the stream is retried; once text has been sent it can't be taken back
+    async def open_stream():
+        with timed("llm_stream_open"):
+            return await get_provider().open_stream(prompt, timeout or LLM_TIMEOUT)
+
+    chunks, usage = [], None
+    stream = await with_retries(prompt, lane, open_stream)
+    try:
+        async for text, tokens in stream:
+            usage = tokens or usage
+            if text:
+                chunks.append(text)
+                yield text
+    finally:
+        await stream.aclose()
+        scheduler.record_usage(estimate_tokens(prompt), usage)
+        LLM_PROMPT_CHARS.observe(len(prompt), lane)
+        LLM_RESPONSE_CHARS.observe(sum(map(len, chunks)), lane)
+
+    if key:
+        response_cache.set(key, "".join(chunks))
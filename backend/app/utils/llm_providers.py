@@ -0,0 +1,125 @@
+import importlib, json, re
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from app.utils.config import LLM_PROVIDER
+from app.utils.llm_scheduler import RETRYABLE_STATUS, estimate_tokens
+
+# Provider name -> "module:Class"; modules are only imported once their provider is chosen
+PROVIDERS: Dict[str, str] = {
+    "gemini": "app.utils.gemini_provider:GeminiProvider",
+    "stub": "app.utils.llm_providers:StubProvider",
+}
+
+# Pieces a stub reply is split into when streamed
+STUB_STREAM_CHUNKS = 8
+
+_provider: Optional["LLMProvider"] = None
+
+
+class LLMError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in RETRYABLE_STATUS
+
+
+class TextStream:
+    # An opened model stream: (text, total tokens when known) chunks plus a way to release it early
+    def __init__(self, chunks: AsyncIterator[Tuple[str, Optional[int]]], close: Optional[Callable[[], Awaitable[None]]] = None):
+        self.chunks = chunks
+        self._close = close
+
+    def __aiter__(self):
+        return self.chunks
+
+    async def aclose(self):
+        await self.chunks.aclose()
+        if self._close:
+            await self._close()
+
+
+class LLMProvider:
+    # Name of the model behind the provider; part of every response cache key
+    model = ""
+    # Exceptions other than a retryable LLMError that are worth retrying (e.g. network failures)
+    transient_errors: Tuple[type, ...] = ()
+
+    # Complete a prompt; returns the text and the total token count when the backend reports one.
+    # With a response schema (OpenAPI subset, as Gemini takes it) the reply should be bare JSON matching it.
+    async def generate(self, prompt: str, timeout: float, response_schema: Optional[dict] = None) -> Tuple[str, Optional[int]]:
+        raise NotImplementedError
+
+    # Start streaming a reply; failures before the first chunk must be raised here so they can be retried
+    async def open_stream(self, prompt: str, timeout: float) -> TextStream:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+
+# Document sections of a batch parse prompt
+DOCUMENT_RE = re.compile(r"### Document (\d+):\n(.*?)(?=\n+### Document \d+:|\n+\s*### STRICT RULES)", re.S)
+# The document of a single parse prompt, without the instructions and example JSON around it
+SINGLE_DOCUMENT_RE = re.compile(r"^Job Description:\n(.*?)\n+\s*### STRICT RULES", re.S | re.M)
+
+# Deterministic stand-in for a model reply: parse prompts get fenced JSON built by the local
+# parser, anything else gets a fixed email/JD body
+@lru_cache(maxsize=1024)
+def stub_response(prompt: str) -> str:
+    from app.services.fast_parser import fast_parse
+    documents = DOCUMENT_RE.findall(prompt)
+    if documents:
+        return "```json\n" + json.dumps([{"index": int(index), "parsed": fast_parse(text)[0]} for index, text in documents]) + "\n```"
+    if "return JSON" in prompt:
+        document = SINGLE_DOCUMENT_RE.search(prompt)
+        return "```json\n" + json.dumps(fast_parse(document.group(1) if document else prompt)[0]) + "\n```"
+    return "Subject: Your application\n\nDear Candidate,\n\nThank you for applying.\n\nBest regards,\nRecruiting Team"
+
+
+class StubProvider(LLMProvider):
+    # Answers locally without network access or credentials, for development, demos and tests
+    model = "stub"
+
+    async def generate(self, prompt: str, timeout: float, response_schema: Optional[dict] = None) -> Tuple[str, Optional[int]]:
+        text = stub_response(prompt)
+        if response_schema:
+            text = text.removeprefix("```json\n").removesuffix("\n```")
+        return text, estimate_tokens(prompt) + estimate_tokens(text)
+
+    async def open_stream(self, prompt: str, timeout: float) -> TextStream:
+        text, tokens = await self.generate(prompt, timeout)
+        size = max(1, -(-len(text) // STUB_STREAM_CHUNKS))
+        pieces: List[str] = [text[i:i + size] for i in range(0, len(text), size)]
+
+        async def chunks():
+            for i, piece in enumerate(pieces):
+                yield piece, tokens if i == len(pieces) - 1 else None
+
+        return TextStream(chunks())
+
+
+# The configured provider, built on first use
+def get_provider() -> LLMProvider:
+    global _provider
+    if _provider is None:
+        if LLM_PROVIDER not in PROVIDERS:
+            raise LLMError(f"Unknown LLM_PROVIDER {LLM_PROVIDER!r}; expected one of: {', '.join(PROVIDERS)}")
+        module, name = PROVIDERS[LLM_PROVIDER].split(":")
+        _provider = getattr(importlib.import_module(module), name)()
+    return _provider
+
+# Swap in a provider instance, e.g. a Gemini provider on a mock transport in benchmarks
+def set_provider(provider: Optional[LLMProvider]):
+    global _provider
+    _provider = provider
+
+# Release the provider's connections on app shutdown
+async def close_provider():
+    global _provider
+    if _provider is not None:
+        await _provider.aclose()
+        _provider = None
@@ -0,0 +1,152 @@
+import asyncio, heapq, itertools, random, time
+from typing import Dict, Optional
+from app.utils.config import LLM_RPM, LLM_TPM, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX
+from app.utils.metrics import register_collector
+
+# Lower number goes first: interactive JD work jumps ahead of bulk resume parsing and emails
+LANES = {"interactive": 0, "default": 1, "bulk": 2}
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+# Rough token count (~4 characters per token) used for budgets before the real count is known
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    # Refills continuously at `per_minute`; a rate of 0 never limits
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    # Seconds until `amount` can be taken; amounts above the capacity only wait for a full bucket
+    def wait_time(self, amount: float) -> float:
+        if not self.per_minute:
+            return 0.0
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing * 60 / self.per_minute)
+
+    # Take `amount`, going into debt if needed so that later calls wait for it
+    def take(self, amount: float):
+        if self.per_minute:
+            self._refill()
+            self.level -= amount
+
+
+class LaneStats:
+    def __init__(self):
+        self.waiting = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "avg_wait_ms": round(self.total_wait / self.granted * 1000, 2) if self.granted else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2)
+        }
+
+
+class LLMScheduler:
+    # Admits model calls in priority order within requests-per-minute and tokens-per-minute budgets
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.retries = 0
+        self.throttled = 0
+        self.lanes: Dict[str, LaneStats] = {lane: LaneStats() for lane in LANES}
+        self._queue = []
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # Wake whoever is at the head of the queue so it can re-check the budgets
+    def _wake_head(self):
+        if self._queue:
+            future = self._queue[0][3]
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    # Wait for a slot for a call of about `tokens` tokens
+    async def acquire(self, tokens: int, lane: str = "default"):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters can't carry over to a different event loop
+            self._loop, self._queue = loop, []
+        stats = self.lanes[lane]
+        entry = [LANES[lane], next(self._seq), tokens, None]
+        heapq.heappush(self._queue, entry)
+        stats.waiting += 1
+        started = time.monotonic()
+        try:
+            while True:
+                wait = None
+                if self._queue[0] is entry:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        break
+                # Sleep until the budget refills, or until we become the head of the queue
+                entry[3] = loop.create_future()
+                await asyncio.wait([entry[3]], timeout=wait)
+        except BaseException:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+            raise
+        finally:
+            stats.waiting -= 1
+            self._wake_head()
+
+        waited = time.monotonic() - started
+        stats.granted += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+
+    # Settle the token budget once the real token count of a call is known
+    def record_usage(self, estimated: int, actual: Optional[int]):
+        if actual:
+            self.tokens.take(actual - estimated)
+
+    # Jittered exponential backoff before retry number `attempt` (0-based); Retry-After wins when given
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        self.retries += 1
+        if retry_after is not None:
+            return min(retry_after, LLM_BACKOFF_MAX)
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._queue),
+            "lanes": {lane: stats.as_dict() for lane, stats in self.lanes.items()},
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "requests_per_minute": {"limit": self.requests.per_minute, "available": round(self.requests.level, 2)},
+            "tokens_per_minute": {"limit": self.tokens.per_minute, "available": round(self.tokens.level, 2)},
+            "max_retries": LLM_MAX_RETRIES
+        }
+
+
+scheduler = LLMScheduler()
+register_collector(lambda: [
+    ("llm_queue_waiting", "gauge", "Model calls waiting for a scheduler slot",
+     [({"lane": lane}, stats.waiting) for lane, stats in scheduler.lanes.items()]),
+    ("llm_queue_granted_total", "counter", "Model calls admitted by the scheduler",
+     [({"lane": lane}, stats.granted) for lane, stats in scheduler.lanes.items()]),
+    ("llm_queue_wait_seconds_total", "counter", "Time model calls spent waiting for a slot",
+     [({"lane": lane}, round(stats.total_wait, 6)) for lane, stats in scheduler.lanes.items()]),
+    ("llm_retries_total", "counter", "Model calls retried after a retryable failure", [({}, scheduler.retries)]),
+])
@@ -0,0 +1,177 @@
+import threading, time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds, from sub-millisecond local work up to slow model calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Characters of prompts and responses
+SIZE_BUCKETS = (100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+_metrics: List["Metric"] = []
+_collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[dict, float]]]]]] = []
+
+# Stage timings of the current HTTP request, for the Server-Timing header; None outside requests
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            lines.extend(self._render_series(labels, values))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0]
+            series[0] += amount
+
+    def _render_series(self, labels: tuple, values: list) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, labels)} {values[0]}"]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    # Series layout: one count per bucket plus +Inf, then sum and count
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _render_series(self, labels: tuple, values: list) -> List[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), values):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {values[-2]}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {values[-1]}")
+        return lines
+
+
+# Add samples computed at scrape time (e.g. cache counters other modules already keep);
+# the callback returns (name, type, help, [(labels, value)]) tuples
+def register_collector(collect: Callable[[], List[Tuple[str, str, str, List[Tuple[dict, float]]]]]):
+    _collectors.append(collect)
+
+# Everything in the Prometheus text exposition format
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    # Several collectors may report the same metric family, which must be printed once
+    families: Dict[str, Tuple[str, str, List[Tuple[dict, float]]]] = {}
+    for collect in _collectors:
+        for name, kind, help, samples in collect():
+            families.setdefault(name, (kind, help, []))[2].extend(samples)
+    for name, (kind, help, samples) in families.items():
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}"])
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Latency of pipeline stages", ["stage"])
+STAGE_ERRORS = Counter("stage_errors_total", "Pipeline stages that raised", ["stage"])
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency until the response starts", ["endpoint", "status"])
+LLM_PROMPT_CHARS = Histogram("llm_prompt_chars", "Size of prompts sent to the model", ["lane"], SIZE_BUCKETS)
+LLM_RESPONSE_CHARS = Histogram("llm_response_chars", "Size of model responses", ["lane"], SIZE_BUCKETS)
+LLM_ERRORS = Counter("llm_errors_total", "Failed model calls by status code", ["status"])
+PARSE_OUTPUTS = Counter("llm_parse_outputs_total", "Parsing replies by outcome: clean JSON, recovered from noise, or unusable", ["result"])
+PROMPT_DOCUMENT_TOKENS = Counter("prompt_document_tokens_total", "Estimated tokens of distinct documents before and after prompt compaction", ["stage"])
+
+
+class timed:
+    # Time a block as a pipeline stage: feeds the stage histogram, the error counter and the
+    # Server-Timing header of the current request
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            STAGE_ERRORS.inc(self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+        return False
+
+
+# Server-Timing value: total time per stage, in first-seen order
+def server_timing(timings: List[Tuple[str, float]]) -> str:
+    totals: Dict[str, List[float]] = {}
+    for stage, elapsed in timings:
+        total = totals.setdefault(stage, [0.0, 0])
+        total[0] += elapsed
+        total[1] += 1
+    return ", ".join(f'{stage};dur={total * 1000:.1f};desc="{count}x"' for stage, (total, count) in totals.items())
+
+
+class MetricsMiddleware:
+    # ASGI middleware: request latency histogram plus a Server-Timing header with the stage totals
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                endpoint = scope.get("endpoint")
+                HTTP_SECONDS.observe(time.perf_counter() - start, getattr(endpoint, "__name__", "unmatched"), str(message["status"]))
+                if timings:
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", server_timing(timings).encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,271 @@
+"""Offline microbenchmarks for extraction, parsing, scoring and gap analysis.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench                      # run and compare against benchmarks/baseline.json
+    python -m benchmarks.bench --save-baseline      # store this run as the new baseline
+    python -m benchmarks.bench --filter score       # only benchmarks whose name contains "score"
+"""
+import os
+
+# Benchmarks run offline and measure the work itself: no caches, stores or rate limits
+os.environ.update({
+    "LLM_CACHE_ENABLED": "false",
+    "EXTRACTION_CACHE_ENABLED": "false",
+    "CANDIDATE_STORE_ENABLED": "false",
+    "DEDUP_ENABLED": "false",
+    "LLM_RPM": "0",
+    "LLM_TPM": "0",
+    "GEMINI_MODEL": os.environ.get("GEMINI_MODEL") or "stub-model",
+})
+
+import argparse, asyncio, json, platform, statistics, sys, tempfile, time
+from typing import Callable, Dict, List, Optional
+from benchmarks import stub_llm
+from benchmarks.corpus import build_corpus, parsed_documents, resume_text, SIZES
+from app.services.file_processing import extract_text_from_file
+from app.services.generate_jd import strip_json_fences, recover_json, parse_jd_with_gemini, parse_batch_with_gemini
+from app.services.fast_parser import fast_parse
+from app.services.calculate_match_score import calculate_match_score, calculate_match_scores, experience_score, education_score
+from app.services.normalize import experience_range, normalize_parsed
+from app.services.generate_remarks import analyze_gap
+from app.services.pipeline import score_resumes
+from app.services.dedup import minhash
+from app.services.compaction import compact_document
+from app.services.prompts import parse_jd_with_gemini_prompt, parse_batch_with_gemini_prompt
+from app.utils.singleflight import SingleFlight
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Each timing repeat runs for at least this long
+MIN_REPEAT_SECONDS = 0.2
+
+
+class Benchmark:
+    def __init__(self, name: str, fn: Callable[[], object], items: int = 1):
+        self.name = name
+        self.fn = fn
+        # Units of work per call, e.g. candidates scored in one batch call
+        self.items = items
+
+    # Median time per call over `repeats` runs of an auto-sized loop
+    def run(self, repeats: int) -> dict:
+        self.fn()
+        loops = 1
+        while (elapsed := self._time(loops)) < MIN_REPEAT_SECONDS:
+            loops = max(loops * 2, int(loops * MIN_REPEAT_SECONDS * 1.1 / max(elapsed, 1e-9)))
+        timings = [self._time(loops) / loops for _ in range(repeats)]
+        per_call = statistics.median(timings)
+        return {
+            "per_op_us": round(per_call / self.items * 1e6, 3),
+            "min_us": round(min(timings) / self.items * 1e6, 3),
+            "ops_per_sec": round(self.items / per_call, 1),
+            "loops": loops
+        }
+
+    def _time(self, loops: int) -> float:
+        fn = self.fn
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        return time.perf_counter() - start
+
+
+# Broken batch replies and what recover_json must make of them; the recover_json/batch-*
+# benchmarks refuse to time a wrong answer
+def batch_recovery_cases(items: List[dict]) -> Dict[str, tuple]:
+    # An empty skills list in the first entry, so a scan of inner arrays would find "[]"
+    items = [{**items[0], "parsed": {**items[0]["parsed"], "skills": []}}] + items[1:]
+    reply = json.dumps(items)
+    truncated = reply[:int(len(reply) * 0.8)]
+    return {
+        "batch-comma": ("Here are the results:\n" + reply[:-1] + ",]", items),
+        "batch-truncated": (truncated, [item for item in items if json.dumps(item) in truncated]),
+    }
+
+# Running headers repeated on every page go, repeated lines within one page stay, and nothing
+# after the line where the token budget ran out is kept
+def check_compaction():
+    document = "Jane Doe - CV\nSKILLS\n- Python\n- Python\n\fJane Doe - CV\nEXPERIENCE\n- Built APIs"
+    if compact_document.__wrapped__(document, 0).splitlines() != ["Jane Doe - CV", "SKILLS", "- Python", "- Python", "EXPERIENCE", "- Built APIs"]:
+        raise AssertionError("compact_document dropped lines that only repeat within a page, or kept running headers")
+    cut = compact_document.__wrapped__("SKILLS\nPython\nEXPERIENCE\n" + "x" * 40 + "\nshort", 8)
+    if cut.splitlines() != ["SKILLS", "Python", "EXPERIENCE"]:
+        raise AssertionError("compact_document kept lines after the budget cut")
+
+# A truncated reply must come back as the outer object with its complete members, not an inner one
+def check_object_recovery(reply: dict):
+    nested = json.dumps({"parsed": reply, "notes": {"source": "resume"}, "extra": "cut"})
+    truncated = nested[:nested.index(', "extra"')]
+    if recover_json(truncated)[0] != {"parsed": reply, "notes": {"source": "resume"}}:
+        raise AssertionError("recover_json returned an inner object of a truncated reply")
+    return truncated
+
+def check_recovery(text: str, expected: List[dict]):
+    value, _ = recover_json(text, list)
+    recovered = [item for item in value if "index" in item]
+    if recovered != expected:
+        raise AssertionError(f"recover_json returned {len(recovered)} batch entries, expected {len(expected)}")
+
+# A caller arriving right after the last waiter of a call gave up must start a new call, not join
+# the one being cancelled
+def check_single_flight_rejoin(loop: asyncio.AbstractEventLoop):
+    async def scenario():
+        flight = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        return await flight.do("key", call)
+
+    try:
+        loop.run_until_complete(scenario())
+    except asyncio.CancelledError:
+        raise AssertionError("SingleFlight handed a new caller a call cancelled by someone else")
+
+# Many concurrent callers of one key, as identical prompts arrive together
+def single_flight_burst(loop: asyncio.AbstractEventLoop, callers: int):
+    async def burst():
+        flight = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0)
+            return "done"
+
+        return await asyncio.gather(*(flight.do("key", call) for _ in range(callers)))
+
+    return loop.run_until_complete(burst())
+
+# Score and gap analysis apply the same experience rule (more years than asked is fine), a JD
+# accepting several degrees is met by the lowest, and experience is read from its first phrase
+def check_scoring_rules():
+    jd = normalize_parsed({"experience": "3-5 years", "education": "Bachelor's or Master's degree", "skills": []})
+    for experience, meets in (("8 years", True), ("4 years", True), ("2 years", False)):
+        candidate = normalize_parsed({"experience": experience, "education": "B.Tech", "skills": []})
+        flagged = any(remark.startswith("Experience mismatch") for remark in analyze_gap(jd, candidate)["remarks"])
+        if (experience_score(jd, candidate) == 100.0) != meets or flagged == meets:
+            raise AssertionError(f"Score and gap analysis disagree on {experience!r} against {jd['experience']!r}")
+        if education_score(jd, candidate) != 100.0:
+            raise AssertionError("A bachelor's degree doesn't meet \"Bachelor's or Master's degree\"")
+    if experience_range("5 years in Python, 3-4 years in Java") != [5.0, 5.0]:
+        raise AssertionError("Experience wasn't read from its first phrase")
+
+# A near-duplicate scores like its original but must not take a shortlist place from someone else
+def check_duplicate_shortlist(main: dict, others: List[dict]):
+    parsed_list = [others[0], others[0], others[1]]
+    results = score_resumes(["a.pdf", "a_copy.pdf", "b.pdf"], parsed_list, main, top_k=2, duplicate_of=[None, "a.pdf", None])
+    if [result["shortlisted"] for result in results] != [True, False, True]:
+        raise AssertionError("A near-duplicate took a shortlist place")
+
+def build_benchmarks(corpus_dir: str) -> List[Benchmark]:
+    loop = asyncio.new_event_loop()
+    stub_llm.install()
+    benchmarks = []
+
+    for key, path in sorted(build_corpus(corpus_dir).items()):
+        benchmarks.append(Benchmark(f"extract/{key}", lambda path=path: extract_text_from_file(path)))
+
+    check_compaction()
+    for size, words in SIZES.items():
+        text = resume_text(words, seed=words)
+        benchmarks.append(Benchmark(f"fast_parse/{size}", lambda text=text: fast_parse(text)))
+        benchmarks.append(Benchmark(f"minhash/{size}", lambda text=text: minhash(text)))
+        # Unwrapped: the memoized version would only time a cache lookup
+        benchmarks.append(Benchmark(f"compact_document/{size}", lambda text=text: compact_document.__wrapped__(text)))
+
+    main = parsed_documents(1, 5, 15, seed=1)[0]
+    reply = stub_llm.stub_response(parse_jd_with_gemini_prompt(resume_text(SIZES["small"])))
+    benchmarks.append(Benchmark("strip_json_fences", lambda: strip_json_fences(reply)))
+    benchmarks.append(Benchmark("recover_json/clean", lambda: recover_json(reply)))
+    noisy = "Here is the data:\n" + reply.replace("]", ",]", 1)[:-12]
+    benchmarks.append(Benchmark("recover_json/noisy", lambda: recover_json(noisy)))
+    truncated = check_object_recovery(json.loads(strip_json_fences(reply)))
+    benchmarks.append(Benchmark("recover_json/truncated-nested", lambda: recover_json(truncated)))
+    batch_reply = strip_json_fences(stub_llm.stub_response(parse_batch_with_gemini_prompt([resume_text(300, seed=seed) for seed in range(8)])))
+    for name, (text, expected) in batch_recovery_cases(json.loads(batch_reply)).items():
+        check_recovery(text, expected)
+        benchmarks.append(Benchmark(f"recover_json/{name}", lambda text=text: recover_json(text, list)))
+    document = resume_text(SIZES["small"], seed=2)
+    benchmarks.append(Benchmark("parse_jd_with_gemini/stub", lambda: loop.run_until_complete(parse_jd_with_gemini(document))))
+    batch = [resume_text(300, seed=seed) for seed in range(8)]
+    check_single_flight_rejoin(loop)
+    benchmarks.append(Benchmark("single_flight/16-callers", lambda: single_flight_burst(loop, 16), items=16))
+    benchmarks.append(Benchmark("parse_batch_with_gemini/stub-8", lambda: loop.run_until_complete(parse_batch_with_gemini(batch)), items=8))
+
+    for count in (1, 100, 10000):
+        others = parsed_documents(count, 10, 40, seed=count)
+        if count == 1:
+            check_scoring_rules()
+            benchmarks.append(Benchmark("calculate_match_score", lambda other=others[0]: calculate_match_score(main, other)))
+            benchmarks.append(Benchmark("analyze_gap", lambda other=others[0]: analyze_gap(main, other)))
+        benchmarks.append(Benchmark(f"calculate_match_scores/{count}", lambda others=others: calculate_match_scores(main, others), items=count))
+        if count == 100:
+            check_duplicate_shortlist(main, others)
+            # Every tenth resume is a copy of the one before it
+            names = [f"r{i}.pdf" for i in range(count)]
+            copies = [names[i - 1] if i % 10 == 9 else None for i in range(count)]
+            benchmarks.append(Benchmark(f"score_resumes/{count}", lambda others=others, names=names, copies=copies:
+                                        score_resumes(names, others, main, top_k=10, duplicate_of=copies), items=count))
+    return benchmarks
+
+def load_baseline() -> Optional[dict]:
+    if not os.path.exists(BASELINE_FILE):
+        return None
+    with open(BASELINE_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+# Print the results table; returns the names that regressed beyond the threshold
+def report(results: Dict[str, dict], baseline: Optional[dict], threshold: float) -> List[str]:
+    regressions = []
+    previous = (baseline or {}).get("results", {})
+    print(f"{'benchmark':40} {'per op':>12} {'ops/s':>12} {'baseline':>12} {'change':>9}")
+    for name, result in results.items():
+        line = f"{name:40} {result['per_op_us']:>10.2f}us {result['ops_per_sec']:>12.1f}"
+        if name in previous:
+            before = previous[name]["per_op_us"]
+            change = (result["per_op_us"] - before) / before * 100 if before else 0.0
+            flag = " !" if change > threshold else ""
+            line += f" {before:>10.2f}us {change:>+8.1f}%{flag}"
+            if flag:
+                regressions.append(name)
+        print(line)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to benchmarks/baseline.json")
+    parser.add_argument("--threshold", type=float, default=20.0, help="slowdown in percent reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 when something regressed")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        results = {}
+        for benchmark in build_benchmarks(corpus_dir):
+            if args.filter in benchmark.name:
+                results[benchmark.name] = benchmark.run(args.repeats)
+
+    run = {"python": platform.python_version(), "machine": platform.machine(), "created": time.time(), "results": results}
+    regressions = report(results, None if args.save_baseline else load_baseline(), args.threshold)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+        print(f"Baseline saved to {BASELINE_FILE}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold}%: {', '.join(regressions)}")
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import io, os, random, zipfile
+from typing import Dict, List
+from xml.sax.saxutils import escape
+from app.services.fast_parser import SKILLS_FILE
+
+# Approximate word counts: a one-page resume, a detailed CV, a long multi-page document
+SIZES = {"small": 300, "medium": 1500, "large": 6000}
+FORMATS = ("txt", "pdf", "docx")
+
+FILLER = (
+    "designed built maintained delivered led improved migrated automated scaled reviewed mentored "
+    "services platform pipeline team product customers data reliability performance features api "
+    "systems infrastructure release quality monitoring latency throughput cost users projects"
+).split()
+DEGREES = ["Bachelor of Science in Computer Science", "Master's degree in Software Engineering",
+           "B.Tech in Information Technology", "PhD in Machine Learning", "Diploma in Computer Applications"]
+
+
+def load_skills() -> List[str]:
+    with open(SKILLS_FILE, encoding="utf-8") as f:
+        return [line.split("|")[0].strip() for line in f if line.strip() and not line.startswith("#")]
+
+# Deterministic resume-like text of about `words` words
+def resume_text(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    skills = load_skills()
+    lines = [
+        f"Candidate {seed}",
+        f"{rng.randint(1, 15)}+ years of experience",
+        rng.choice(DEGREES),
+        "Skills: " + ", ".join(rng.sample(skills, rng.randint(8, 30))),
+    ]
+    count = sum(len(line.split()) for line in lines)
+    while count < words:
+        sentence = " ".join(rng.choice(FILLER) for _ in range(rng.randint(8, 16)))
+        if rng.random() < 0.3:
+            sentence += " using " + rng.choice(skills)
+        lines.append(sentence.capitalize() + ".")
+        count += len(sentence.split())
+    return "\n".join(lines)
+
+def pdf_bytes(text: str) -> bytes:
+    import fitz
+    doc = fitz.open()
+    lines = text.splitlines()
+    # ~50 lines per page keeps text inside the page
+    for start in range(0, len(lines), 50):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), "\n".join(lines[start:start + 50]), fontsize=8)
+    content = doc.tobytes()
+    doc.close()
+    return content
+
+# Minimal WordprocessingML package: enough for docx2txt and Word to open it
+def docx_bytes(text: str) -> bytes:
+    paragraphs = "".join(f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(line)}</w:t></w:r></w:p>" for line in text.splitlines())
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>')
+        docx.writestr("_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/></Relationships>')
+        docx.writestr("word/document.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>')
+    return buffer.getvalue()
+
+# Write one file per format and size into `directory`; returns {"pdf-small": path, ...}
+def build_corpus(directory: str) -> Dict[str, str]:
+    os.makedirs(directory, exist_ok=True)
+    writers = {"txt": lambda text: text.encode("utf-8"), "pdf": pdf_bytes, "docx": docx_bytes}
+    paths = {}
+    for size, words in SIZES.items():
+        text = resume_text(words, seed=words)
+        for fmt in FORMATS:
+            path = os.path.join(directory, f"resume-{size}.{fmt}")
+            with open(path, "wb") as f:
+                f.write(writers[fmt](text))
+            paths[f"{fmt}-{size}"] = path
+    return paths
+
+# Parsed documents shaped like Gemini output: JDs list 5-15 skills, resumes 10-40
+def parsed_documents(count: int, min_skills: int, max_skills: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    skills = load_skills()
+    experiences = ["2 years", "3-5 years", "5+ years", "7 years of experience", "10+ years", "fresher", ""]
+    return [{
+        "skills": rng.sample(skills, rng.randint(min_skills, max_skills)),
+        "experience": rng.choice(experiences),
+        "education": rng.choice(DEGREES + [""]),
+        "job_title": "Software Engineer",
+        "company_name": ""
+    } for _ in range(count)]
@@ -0,0 +1,17 @@
+import json
+import httpx
+from app.utils.llm_providers import set_provider, stub_response
+from app.utils.gemini_provider import GeminiProvider
+from app.utils import llm_client
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    prompt = json.loads(request.content)["contents"][0]["parts"][0]["text"]
+    return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": stub_response(prompt)}]}}]})
+
+# Route every model call through the Gemini provider on a mock transport, so timings include request
+# encoding and response decoding, with the response cache off so each call does the full work.
+# stub_response is memoized so timings measure our side of the call.
+def install():
+    set_provider(GeminiProvider("stub-model", httpx.AsyncClient(base_url="http://stub", transport=httpx.MockTransport(handler))))
+    llm_client.set_response_cache(None)
@@ -0,0 +1,116 @@
+"""Local stand-in for the Gemini REST API, for load tests.
+
+Serves generateContent and streamGenerateContent (SSE) under /v1beta/models/{model}:{method} with
+deterministic replies and configurable latency, error rate, streaming behaviour and JSON noise:
+
+    python -m loadtest.fake_gemini --port 9100 --latency lognormal --latency-mean 0.8 --error-rate 0.02
+"""
+import argparse, asyncio, json, math, random
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.utils.llm_providers import stub_response
+
+
+class FakeGemini:
+    def __init__(self, latency: str = "constant", latency_mean: float = 0.5, latency_sigma: float = 0.5,
+                 error_rate: float = 0.0, error_status: int = 503, stream_chunks: int = 20,
+                 stream_delay: float = 0.02, json_noise: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_chunks = stream_chunks
+        self.stream_delay = stream_delay
+        self.json_noise = json_noise
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    # Seconds to wait before answering: constant, uniform on [0, 2*mean] or lognormal with the given mean
+    def delay(self) -> float:
+        if self.latency == "uniform":
+            return self.random.uniform(0, 2 * self.latency_mean)
+        if self.latency == "lognormal":
+            mu = math.log(self.latency_mean) - self.latency_sigma ** 2 / 2
+            return self.random.lognormvariate(mu, self.latency_sigma)
+        return self.latency_mean
+
+    def app(self) -> FastAPI:
+        app = FastAPI(title="Fake Gemini")
+
+        @app.post("/v1beta/models/{target}")
+        async def generate(target: str, request: Request):
+            self.requests += 1
+            method = target.rsplit(":", 1)[-1]
+            body = await request.json()
+            prompt = body["contents"][0]["parts"][0]["text"]
+            await asyncio.sleep(self.delay())
+
+            if self.random.random() < self.error_rate:
+                self.errors += 1
+                error = {"error": {"code": self.error_status, "message": "Injected failure", "status": "UNAVAILABLE"}}
+                return JSONResponse(status_code=self.error_status, content=error, headers={"retry-after": "1"})
+
+            text = stub_response(prompt)
+            if body.get("generationConfig", {}).get("responseMimeType") == "application/json":
+                # Structured output comes back as bare JSON
+                text = text.removeprefix("```json\n").removesuffix("\n```")
+            if text.lstrip().startswith(("```json", "{", "[")) and self.random.random() < self.json_noise:
+                text = self.noisy(text)
+            usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4,
+                     "totalTokenCount": (len(prompt) + len(text)) // 4}
+            if method == "streamGenerateContent":
+                return StreamingResponse(self.stream(text, usage), media_type="text/event-stream")
+            return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}], "usageMetadata": usage}
+
+        @app.get("/stats")
+        async def stats():
+            return {"requests": self.requests, "errors": self.errors}
+
+        return app
+
+    # JSON the way models sometimes botch it: wrapped in prose, with a trailing comma, or cut short
+    def noisy(self, text: str) -> str:
+        kind = self.random.choice(("prose", "comma", "truncated"))
+        if kind == "prose":
+            return f"Sure! Here is the extracted data:\n{text}\nLet me know if you need anything else."
+        if kind == "comma":
+            return text.replace("]", ",]", 1)
+        return text[:max(1, int(len(text) * 0.9))]
+
+    # Split the reply into stream_chunks SSE events, stream_delay apart; usage rides on the last one
+    async def stream(self, text: str, usage: dict):
+        size = max(1, math.ceil(len(text) / max(1, self.stream_chunks)))
+        pieces = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        for i, piece in enumerate(pieces):
+            chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}}]}
+            if i == len(pieces) - 1:
+                chunk["usageMetadata"] = usage
+            yield f"data: {json.dumps(chunk)}\r\n\r\n"
+            await asyncio.sleep(self.stream_delay)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", choices=("constant", "uniform", "lognormal"), default="lognormal")
+    parser.add_argument("--latency-mean", type=float, default=0.5, help="mean model latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal shape; larger means a longer tail")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--stream-chunks", type=int, default=20)
+    parser.add_argument("--stream-delay", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--json-noise", type=float, default=0.0, help="fraction of JSON replies wrapped in prose, given a trailing comma or truncated")
+
+def from_arguments(args: argparse.Namespace) -> FakeGemini:
+    return FakeGemini(args.latency, args.latency_mean, args.latency_sigma, args.error_rate,
+                      args.error_status, args.stream_chunks, args.stream_delay, args.json_noise)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(from_arguments(args).app(), host=args.host, port=args.port, log_level="warning")
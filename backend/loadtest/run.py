@@ -0,0 +1,238 @@
+"""End-to-end load test: the real app under uvicorn against a local fake Gemini.
+
+Starts loadtest.fake_gemini and main:app (one uvicorn worker, throwaway storage), then drives each
+scenario with closed-loop clients at every concurrency level and prints latency percentiles and
+throughput. Run from the backend directory:
+
+    python -m loadtest.run                                          # default scenarios and levels
+    python -m loadtest.run --scenarios compare emails --batch-sizes 1 10 50 --concurrency 1 8 32
+    python -m loadtest.run --scenarios mixed --latency-mean 1.5 --error-rate 0.05 --json out.json
+"""
+import argparse, asyncio, itertools, json, os, platform, random, socket, subprocess, sys, tempfile, time
+from typing import Awaitable, Callable, List, Optional
+import httpx
+from benchmarks.corpus import resume_text, docx_bytes, pdf_bytes, load_skills
+from loadtest import fake_gemini
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("generate_jd", "generate_jd_stream", "manual_jd", "upload_jd", "compare", "emails", "mixed")
+# Share of each request type in the mixed workload
+MIXED_WEIGHTS = {"generate_jd": 2, "generate_jd_stream": 2, "manual_jd": 1, "upload_jd": 1, "compare": 3, "emails": 1}
+FILE_TYPES = {"txt": ("text/plain", lambda text: text.encode("utf-8")), "pdf": ("application/pdf", pdf_bytes),
+              "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", docx_bytes)}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+# Nearest-rank percentile of sorted values
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values) + 0.5) - 1))]
+
+
+class Workload:
+    # Builds requests for each scenario; every document is unique so caches and dedup don't flatter the numbers
+    def __init__(self, file_type: str, parse_mode: Optional[str], seed: int = 0):
+        self.content_type, self.encode = FILE_TYPES[file_type]
+        self.extension = file_type
+        self.parse_mode = parse_mode
+        self.skills = load_skills()
+        self.random = random.Random(seed)
+        self._seeds = itertools.count(seed * 1_000_000)
+
+    def document(self, words: int = 300) -> str:
+        return resume_text(words, seed=next(self._seeds))
+
+    def jd_text(self) -> str:
+        return self.document(200)
+
+    def jd_fields(self, stream: bool) -> dict:
+        return {"job_title": f"Engineer {next(self._seeds)}", "experience": f"{self.random.randint(1, 12)} years",
+                "skills": ", ".join(self.random.sample(self.skills, 8)), "company": "Acme", "employment_type": "Full-time",
+                "industry": "Software", "location": "Remote", "stream": str(stream).lower()}
+
+    def resumes(self, count: int) -> list:
+        return [("files", (f"resume-{i}.{self.extension}", self.encode(self.document()), self.content_type)) for i in range(count)]
+
+    def batch_form(self) -> dict:
+        form = {"jd_text": self.jd_text()}
+        if self.parse_mode:
+            form["parse_mode"] = self.parse_mode
+        return form
+
+    # One callable per scenario; it sends a single request and returns the status code
+    def request(self, scenario: str, batch_size: int) -> Callable[[httpx.AsyncClient], Awaitable[int]]:
+        if scenario == "mixed":
+            names = list(MIXED_WEIGHTS)
+            scenario = self.random.choices(names, [MIXED_WEIGHTS[name] for name in names])[0]
+        if scenario == "generate_jd":
+            return lambda client: self._post(client, "/generate_jd", data=self.jd_fields(False))
+        if scenario == "generate_jd_stream":
+            return lambda client: self._stream(client, "/generate_jd", data=self.jd_fields(True))
+        if scenario == "manual_jd":
+            return lambda client: self._post(client, "/manual_jd", data={"jd_text": self.jd_text()})
+        if scenario == "upload_jd":
+            files = [("file", (f"jd.{self.extension}", self.encode(self.jd_text()), self.content_type))]
+            return lambda client: self._post(client, "/upload_jd_file", files=files)
+        if scenario == "compare":
+            return lambda client: self._post(client, "/compare-jd-and-files/", data=self.batch_form(), files=self.resumes(batch_size))
+        if scenario == "emails":
+            return lambda client: self._post(client, "/generate-emails/", data=self.batch_form(), files=self.resumes(batch_size))
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    async def _post(self, client: httpx.AsyncClient, path: str, **kwargs) -> int:
+        response = await client.post(path, **kwargs)
+        return response.status_code
+
+    # Streaming requests count as done once the whole body has arrived
+    async def _stream(self, client: httpx.AsyncClient, path: str, **kwargs) -> int:
+        async with client.stream("POST", path, **kwargs) as response:
+            async for _ in response.aiter_bytes():
+                pass
+            return response.status_code
+
+
+async def run_level(base_url: str, workload: Workload, scenario: str, batch_size: int, concurrency: int,
+                    duration: float, max_requests: Optional[int]) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    issued = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+        async def worker(deadline: float):
+            nonlocal errors
+            while time.monotonic() < deadline and (max_requests is None or next(issued) < max_requests):
+                send = workload.request(scenario, batch_size)
+                start = time.perf_counter()
+                try:
+                    status = await send(client)
+                except httpx.HTTPError:
+                    status = 0
+                latencies.append(time.perf_counter() - start)
+                if not 200 <= status < 300:
+                    errors += 1
+
+        start = time.monotonic()
+        await asyncio.gather(*(worker(start + duration) for _ in range(concurrency)))
+        elapsed = time.monotonic() - start
+
+    latencies.sort()
+    return {
+        "scenario": scenario,
+        "batch_size": batch_size if scenario in ("compare", "emails", "mixed") else None,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0
+    }
+
+def print_row(row: dict, calls_per_request: Optional[float] = None):
+    batch = "-" if row["batch_size"] is None else str(row["batch_size"])
+    calls = "-" if calls_per_request is None else f"{calls_per_request:.1f}"
+    print(f"{row['scenario']:20} {batch:>5} {row['concurrency']:>5} {row['requests']:>8} {row['errors']:>7} "
+          f"{row['rps']:>8.2f} {row['p50_ms']:>9.1f} {row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} {calls:>8}")
+
+async def drive(base_url: str, fake_url: str, args: argparse.Namespace) -> List[dict]:
+    workload = Workload(args.file_type, args.parse_mode)
+    rows = []
+    print(f"{'scenario':20} {'batch':>5} {'conc':>5} {'requests':>8} {'errors':>7} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'llm/req':>8}")
+    async with httpx.AsyncClient(timeout=10) as stats_client:
+        for scenario in args.scenarios:
+            batch_sizes = args.batch_sizes if scenario in ("compare", "emails", "mixed") else [None]
+            for batch_size in batch_sizes:
+                for concurrency in args.concurrency:
+                    before = (await stats_client.get(f"{fake_url}/stats")).json()["requests"]
+                    row = await run_level(base_url, workload, scenario, batch_size, concurrency, args.duration, args.max_requests)
+                    calls = (await stats_client.get(f"{fake_url}/stats")).json()["requests"] - before
+                    row["model_calls"] = calls
+                    print_row(row, calls / row["requests"] if row["requests"] else None)
+                    rows.append(row)
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["generate_jd", "generate_jd_stream", "compare", "emails", "mixed"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 10, 50], help="resumes per compare/emails request")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per scenario and concurrency level")
+    parser.add_argument("--max-requests", type=int, help="stop a level early after this many requests")
+    parser.add_argument("--file-type", choices=FILE_TYPES, default="txt", help="format of uploaded resumes and JDs")
+    parser.add_argument("--parse-mode", help="parse_mode sent with compare/emails requests")
+    parser.add_argument("--cache", action="store_true", help="keep the LLM response cache on (off by default)")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="extra environment for the app, repeatable")
+    parser.add_argument("--app-url", help="load an already running app instead of starting one (its model settings are up to you)")
+    parser.add_argument("--json", help="also write the results to this file")
+    fake_gemini.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    fake_port, app_port = free_port(), free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    processes = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            fake_cmd = [sys.executable, "-m", "loadtest.fake_gemini", "--port", str(fake_port),
+                        "--latency", args.latency, "--latency-mean", str(args.latency_mean),
+                        "--latency-sigma", str(args.latency_sigma), "--error-rate", str(args.error_rate),
+                        "--error-status", str(args.error_status), "--stream-chunks", str(args.stream_chunks),
+                        "--stream-delay", str(args.stream_delay), "--json-noise", str(args.json_noise)]
+            processes.append(subprocess.Popen(fake_cmd, cwd=BACKEND_DIR))
+            wait_ready(f"{fake_url}/stats", processes[-1])
+
+            base_url = args.app_url
+            if not base_url:
+                # Relative storage, cache and upload paths land in the throwaway working directory
+                env = {**os.environ,
+                       "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])),
+                       "GEMINI_API_BASE": f"{fake_url}/v1beta", "GEMINI_API_KEY": "loadtest",
+                       "GEMINI_MODEL": os.environ.get("GEMINI_MODEL") or "fake-gemini",
+                       "LLM_CACHE_ENABLED": str(args.cache).lower(), "EXTRACTION_CACHE_ENABLED": str(args.cache).lower(),
+                       "LLM_RPM": "0", "LLM_TPM": "0"}
+                env.update(item.split("=", 1) for item in args.app_env)
+                processes.append(subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port),
+                                                   "--log-level", "warning", "--no-access-log"], cwd=workdir, env=env))
+                base_url = f"http://127.0.0.1:{app_port}"
+                wait_ready(f"{base_url}/health", processes[-1], timeout=60)
+
+            rows = asyncio.run(drive(base_url, fake_url, args))
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=10)
+
+    if args.json:
+        run = {"python": platform.python_version(), "machine": platform.machine(), "created": time.time(),
+               "fake": {"latency": args.latency, "latency_mean": args.latency_mean, "latency_sigma": args.latency_sigma,
+                        "error_rate": args.error_rate, "stream_chunks": args.stream_chunks, "stream_delay": args.stream_delay,
+                        "json_noise": args.json_noise},
+               "results": rows}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,23 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router as app_router
-import os
-from app.utils.config import UPLOAD_DIR
+from app.utils.llm_client import close_client
+from app.services.extraction_pool import shutdown_pool
+from app.services.jobs import start_job_workers, stop_job_workers
+from app.utils.metrics import MetricsMiddleware
 
-app = FastAPI(title="Recruitment AI - Complete JD Management with Email Generation")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resume background jobs left over from a previous run
+    start_job_workers()
+    yield
+    await stop_job_workers()
+    # Release pooled LLM connections and extraction workers
+    await close_client()
+    shutdown_pool()
+
+app = FastAPI(title="Recruitment AI - Complete JD Management with Email Generation", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,8 +27,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ensure upload directory exists
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Request latency and Server-Timing stage breakdown
+app.add_middleware(MetricsMiddleware)
 
 # Register all routes
 app.include_router(app_router)
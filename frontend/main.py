@@ -29,6 +29,8 @@ if 'jd_source' not in st.session_state:
     st.session_state.jd_source = ""
 if 'jd_analysis' not in st.session_state:
     st.session_state.jd_analysis = {}
+if 'compare_session' not in st.session_state:
+    st.session_state.compare_session = {}
 
 def reset_workflow():
     """Reset the entire workflow"""
@@ -36,6 +38,21 @@ def reset_workflow():
     st.session_state.jd_content = ""
     st.session_state.jd_source = ""
     st.session_state.jd_analysis = {}
+    st.session_state.compare_session = {}
+
+def stream_jd_request(endpoint, data=None, files=None):
+    """Stream a JD from the API, rendering it as it is generated"""
+    payload = dict(data or {}, stream="true")
+    with requests.post(f"{API_BASE}{endpoint}", data=payload, files=files, stream=True) as response:
+        if response.status_code != 200:
+            return None, response.text
+        placeholder = st.empty()
+        text = ""
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            text += chunk
+            placeholder.markdown(text)
+        placeholder.empty()
+        return text.strip(), None
 
 def next_step():
     """Move to next step"""
@@ -116,20 +133,19 @@ if st.session_state.step == 1:
                 with st.spinner("Processing file..."):
                     try:
                         files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
-                        response = requests.post(f"{API_BASE}/upload_jd_file", files=files)
+                        text, error = stream_jd_request("/upload_jd_file", files=files)
                         
-                        if response.status_code == 200:
-                            result = response.json()
-                            st.session_state.jd_content = result.get("text", "")
+                        if error is None:
+                            st.session_state.jd_content = text
                             st.session_state.jd_source = f"Uploaded file: {uploaded_file.name}"
-                            st.session_state.jd_analysis = result.get("analysis", {})
+                            st.session_state.jd_analysis = {}
                             
                             st.toast("Job Description processed successfully!")
                             
                             with st.expander("View Processed Job Description", expanded=True):
                                 st.markdown(st.session_state.jd_content)
                         else:
-                            st.error(f"Failed to process file: {response.text}")
+                            st.error(f"Failed to process file: {error}")
                     except Exception as e:
                         st.error(f"Error: {str(e)}")
         
@@ -148,20 +164,19 @@ if st.session_state.step == 1:
             if st.button("Format & Process JD") and jd_text.strip():
                 with st.spinner("Processing and formatting..."):
                     try:
-                        response = requests.post(f"{API_BASE}/manual_jd", data={"jd_text": jd_text})
+                        text, error = stream_jd_request("/manual_jd", data={"jd_text": jd_text})
                         
-                        if response.status_code == 200:
-                            result = response.json()
-                            st.session_state.jd_content = result.get("text", "")
+                        if error is None:
+                            st.session_state.jd_content = text
                             st.session_state.jd_source = "Manual input"
-                            st.session_state.jd_analysis = result.get("analysis", {})
+                            st.session_state.jd_analysis = {}
                             
                             st.toast("Job Description formatted successfully!")
                             
                             with st.expander("View Formatted JD", expanded=True):
                                 st.markdown(st.session_state.jd_content)
                         else:
-                            st.error(f"Failed to format JD: {response.text}")
+                            st.error(f"Failed to format JD: {error}")
                     except Exception as e:
                         st.error(f"Error: {str(e)}")
         
@@ -203,20 +218,19 @@ if st.session_state.step == 1:
                                 "industry": industry,
                                 "location": location,
                             }
-                            response = requests.post(f"{API_BASE}/generate_jd", data=payload)
+                            text, error = stream_jd_request("/generate_jd", data=payload)
                             
-                            if response.status_code == 200:
-                                result = response.json()
-                                st.session_state.jd_content = result.get("text", "")
+                            if error is None:
+                                st.session_state.jd_content = text
                                 st.session_state.jd_source = f"AI Generated: {job_title}"
-                                st.session_state.jd_analysis = result.get("analysis", {})
+                                st.session_state.jd_analysis = {}
                                 
                                 st.toast("Job Description generated successfully!")
                                 
                                 with st.expander("View Generated JD", expanded=True):
                                     st.markdown(st.session_state.jd_content)
                             else:
-                                st.error(f"Failed to generate JD: {response.text}")
+                                st.error(f"Failed to generate JD: {error}")
                         except Exception as e:
                             st.error(f"Error: {str(e)}")
         
@@ -294,16 +308,35 @@ elif st.session_state.step == 2:
                     try:
                         # Prepare files for API
                         files_data = [("files", (f.name, f, f.type)) for f in uploaded_files]
+                        files_key = [(f.name, f.size) for f in uploaded_files]
+                        compare_session = st.session_state.compare_session
                         
                         endpoint = "/compare-jd-and-files/" if analysis_mode == "📊 Compare & Analyze Only" else "/generate-emails/"
-                        response = requests.post(
-                            f"{API_BASE}{endpoint}",
-                            data={"jd_text": st.session_state.jd_content},
-                            files=files_data
-                        )
+                        if (endpoint == "/generate-emails/" and compare_session.get("files") == files_key
+                                and compare_session.get("jd") == st.session_state.jd_content):
+                            # Same JD and files as the last comparison: reuse its server-side results
+                            response = requests.post(f"{API_BASE}{endpoint}", data={"session_id": compare_session["id"]})
+                            if response.status_code == 404:
+                                response = requests.post(
+                                    f"{API_BASE}{endpoint}",
+                                    data={"jd_text": st.session_state.jd_content},
+                                    files=files_data
+                                )
+                        else:
+                            response = requests.post(
+                                f"{API_BASE}{endpoint}",
+                                data={"jd_text": st.session_state.jd_content},
+                                files=files_data
+                            )
                         
                         if response.status_code == 200:
                             data = response.json()
+                            if data.get("session_id"):
+                                st.session_state.compare_session = {
+                                    "id": data["session_id"],
+                                    "files": files_key,
+                                    "jd": st.session_state.jd_content
+                                }
                             main_jd = data.get("main_parsed", {})
                             results = data.get("results", [])
                             